@@ -2,52 +2,184 @@
 Flask API for PTT Site Watcher
 """
 import os
+import base64
+import functools
+import hashlib
+import json
+import queue
 import threading
 import time
-from datetime import datetime, timedelta, timezone
-from flask import Flask, jsonify, request
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+from flask import Flask, Response, jsonify, make_response, request
 from flask_cors import CORS
 from dotenv import load_dotenv
 
-from database import Database
-from scraper import scrape_sync
-from email_service import send_change_notification
+from database import Database, ANNOUNCEMENT_FIELDS, ANNOUNCEMENT_SORT_COLUMNS
+from scraper import scrape_crawl, HttpFetcher, PageCache
+from browser_pool import get_browser_pool
+from email_service import deliver_change_notification, send_change_notification, invalidate_accounts, RECIPIENT_MODES
+from email_outbox import OutboxSender
+from events import EventBus
+from models import ScanJob
+from scan_queue import ScanQueue
+from scheduler import ScanScheduler
 
 # Load environment variables
 load_dotenv()
 
 app = Flask(__name__)
-CORS(app)
+# Pagination cursors are returned in a response header
+CORS(app, expose_headers=["X-Next-Cursor"])
+
+# Largest page a client may request from list endpoints
+MAX_PAGE_SIZE = 500
 
 # Initialize database
 db_path = os.getenv("DATABASE_PATH", "ptt_watcher.db")
-db = Database(db_path)
+# Set DB_WATCH_EXTERNAL_CHANGES=1 when another process also writes the database,
+# so cached settings and response ETags notice its updates
+db = Database(db_path, watch_external_changes=os.getenv("DB_WATCH_EXTERNAL_CHANGES", "0") == "1")
 
 # Lock for scan operations
 scan_lock = threading.Lock()
 
+# Long-lived Chromium shared by every scan, relaunched after N page loads
+browser_pool = get_browser_pool(
+    headless=True,
+    max_pages=int(os.getenv("BROWSER_RECYCLE_PAGES", 200))
+)
+
+# Parallel tabs per scan and minimum spacing between requests to the PTT host
+scraper_concurrency = int(os.getenv("SCRAPER_CONCURRENCY", 4))
+scraper_politeness_delay = float(os.getenv("SCRAPER_POLITENESS_DELAY", 0.5))
+# Upper bound on waiting for a page's announcement list to render
+scraper_ready_timeout = float(os.getenv("SCRAPER_READY_TIMEOUT", 15))
+# How long the link count must hold still, and how long a page without links
+# must stay quiet before the network-idle check that confirms it is empty
+scraper_settle_time = float(os.getenv("SCRAPER_SETTLE_TIME", 0.3))
+scraper_empty_grace = float(os.getenv("SCRAPER_EMPTY_GRACE", 2))
+
+# Try plain HTTP before launching the browser; keeps its keep-alive pool across scans
+http_fetcher = HttpFetcher(pool_size=scraper_concurrency) if os.getenv("SCRAPER_HTTP_FAST_PATH", "1") == "1" else None
+
+# Page validators and fingerprints from the last applied scan
+page_cache = PageCache()
+
+# Regular scans stop at the first page of already known announcements; a full
+# crawl with removal detection runs at least this often (seconds)
+full_scan_interval = int(os.getenv("FULL_SCAN_INTERVAL", 3600))
+
+# Change notifications are queued with the scan's changes and sent from a
+# separate worker, retried with exponential backoff before being dead-lettered
+# Notifications list at most EMAIL_MAX_ROWS changes and summarise the rest.
+# Recipients are sent to in batches of EMAIL_BATCH_SIZE, addressed in To: or
+# Bcc: per EMAIL_RECIPIENT_MODE, with up to EMAIL_CONCURRENCY batches in flight
+email_options = {
+    "max_rows": int(os.getenv("EMAIL_MAX_ROWS", 100)),
+    "batch_size": int(os.getenv("EMAIL_BATCH_SIZE", 50)),
+    "recipient_mode": os.getenv("EMAIL_RECIPIENT_MODE", "to"),
+    "concurrency": int(os.getenv("EMAIL_CONCURRENCY", 4)),
+}
+if email_options["recipient_mode"] not in RECIPIENT_MODES:
+    raise ValueError(
+        f"Unknown EMAIL_RECIPIENT_MODE {email_options['recipient_mode']!r}, "
+        f"expected one of {', '.join(RECIPIENT_MODES)}"
+    )
+outbox_sender = OutboxSender(
+    db,
+    functools.partial(deliver_change_notification, **email_options),
+    max_attempts=int(os.getenv("EMAIL_MAX_ATTEMPTS", 6)),
+    retry_base=float(os.getenv("EMAIL_RETRY_BASE", 30)),
+    retry_max=float(os.getenv("EMAIL_RETRY_MAX", 3600)),
+)
+
+# Scan progress and changes pushed to /api/events clients
+event_bus = EventBus()
+# Seconds between SSE comments that keep idle connections open through proxies
+sse_keepalive = float(os.getenv("SSE_KEEPALIVE", 15))
+# Most changes sent in a scan's `changes` event; clients reload the rest
+sse_max_changes = int(os.getenv("SSE_MAX_CHANGES", 100))
+
+
+def run_scraper(incremental: bool = False, on_progress=None):
+    """
+    Scrape announcement pages using the shared browser pool.
+    Returns the announcements and why the crawl stopped (see scraper._CrawlState).
+    """
+    return scrape_crawl(
+        headless=True,
+        pool=browser_pool,
+        concurrency=scraper_concurrency,
+        politeness_delay=scraper_politeness_delay,
+        ready_timeout=scraper_ready_timeout,
+        settle_time=scraper_settle_time,
+        empty_grace=scraper_empty_grace,
+        http_fetcher=http_fetcher,
+        page_cache=page_cache,
+        known_page_check=db.all_known if incremental else None,
+        on_progress=on_progress,
+    )
+
+
+def full_scan_due() -> bool:
+    """Whether the next scan should crawl every page and detect removals"""
+    last_full_scan = db.get_last_full_scan()
+    if last_full_scan is None:
+        return True
+    return (datetime.now() - last_full_scan).total_seconds() >= full_scan_interval
+
 # Auto-scan configuration from database
 def get_auto_scan_interval():
-    settings = db.get_settings()
-    return settings.get("refresh_interval", 600)
+    return db.get_refresh_interval()
 
-auto_scan_enabled = True
-next_auto_scan_time = None  # Tracks when the next auto-scan will occur
 
-
-def perform_scan():
-    """Execute a scan and return changes detected"""
+def current_status() -> dict:
+    """Scan status plus auto-scan state, as served by /api/status"""
+    status = db.get_scan_status()
+    status["auto_scan_enabled"] = auto_scan_scheduler.enabled
+    status["auto_scan_interval"] = get_auto_scan_interval()
+    next_run = auto_scan_scheduler.next_run
+    status["next_auto_scan"] = next_run.isoformat() if next_run else None
+    return status
+
+
+def publish_status():
+    """Push the current status to event stream clients"""
+    if event_bus.subscriber_count:
+        event_bus.publish("status", current_status())
+
+
+def perform_scan(full: Optional[bool] = None, timings: Optional[dict] = None):
+    """
+    Execute a scan and return changes detected.
+    Incremental scans skip removal detection; `full=None` picks the mode by schedule.
+    `timings`, when given, is filled with the mode, phase durations, per-page
+    progress and the error of a failed scan.
+    """
+    timings = timings if timings is not None else {}
+    started = time.monotonic()
+    
+    def record_progress(progress: dict):
+        timings.setdefault("pages", []).append(progress)
+        event_bus.publish("scan_progress", progress)
     
     with scan_lock:
         try:
             db.set_scanning(True)
             
+            if full is None:
+                full = full_scan_due()
+            timings["mode"] = "full" if full else "incremental"
+            print(f"Starting {'full' if full else 'incremental'} scan...")
+            event_bus.publish("scan_started", {"full": full})
+            publish_status()
+            
             # Scrape announcements
-            announcements = scrape_sync(headless=True)
+            announcements, stop_reason = run_scraper(incremental=not full, on_progress=record_progress)
             
-            # Get existing announcement count to detect potential false removals
-            existing_announcements = db.get_all_announcements()
-            existing_count = len(existing_announcements)
+            # Active announcement count (a maintained counter) to detect potential false removals
+            existing_count = db.get_scan_status()["active_count"]
             
             # VERIFICATION: If we got 0 results but there were existing items,
             # or if all existing items would be removed, wait and re-check
@@ -60,21 +192,25 @@ def perform_scan():
                     time.sleep(5)
                     
                     # Re-scrape to confirm
-                    announcements = scrape_sync(headless=True)
+                    announcements, stop_reason = run_scraper(incremental=not full, on_progress=record_progress)
                     scraped_count = len(announcements)
                     print(f"⚠️ Verification scrape got {scraped_count} announcements")
                     
                     # If still 0, skip the removal detection to avoid false positives
                     if scraped_count == 0:
                         print(f"⚠️ Still 0 announcements after verification. Skipping removal detection to avoid false positives.")
+                        page_cache.discard()
                         db.set_scanning(False)
                         last_auto_scan = datetime.now()
+                        timings["total_seconds"] = round(time.monotonic() - started, 3)
+                        event_bus.publish("scan_completed", {"full": full, "changes": 0, "error": None})
+                        publish_status()
                         return []
                 
                 # Case 2: Check if all existing items would be marked as removed
-                else:
+                elif full:
                     scraped_links = set(ann["link"] for ann in announcements)
-                    existing_links = set(a.link for a in existing_announcements if a.link)
+                    existing_links = set(db.get_active_links())
                     would_be_removed = existing_links - scraped_links
                     
                     # If more than 50% would be removed, verify
@@ -83,164 +219,373 @@ def perform_scan():
                         time.sleep(5)
                         
                         # Re-scrape to confirm
-                        announcements = scrape_sync(headless=True)
+                        announcements, stop_reason = run_scraper(incremental=False, on_progress=record_progress)
                         print(f"⚠️ Verification scrape got {len(announcements)} announcements")
             
-            # Process each announcement
-            new_changes = []
-            current_links = []
-            
-            for ann in announcements:
-                current_links.append(ann["link"])
-                _, change = db.upsert_announcement(
-                    title=ann["title"],
-                    date_text=ann["date_text"],
-                    link=ann["link"]
-                )
-                if change:
-                    new_changes.append(change)
-            
-            # Mark removed announcements (only if we got valid results)
-            if len(current_links) > 0:
-                removed_changes = db.mark_removed_announcements(current_links)
-                new_changes.extend(removed_changes)
-            else:
-                print("⚠️ Skipping removal detection due to empty scrape results")
+            # Apply all results in one transaction (only detect removals after a full crawl
+            # that reached a confirmed empty page, i.e. the real end of the list)
+            timings["scrape_seconds"] = round(time.monotonic() - started, 3)
+            timings["stop_reason"] = stop_reason
+            detect_removals = full and stop_reason == "empty" and len(announcements) > 0
+            if full and not detect_removals:
+                if not announcements:
+                    print("⚠️ Skipping removal detection due to empty scrape results")
+                else:
+                    print(f"⚠️ Skipping removal detection: crawl stopped on {stop_reason}, not the end of the list")
+            # Notifications are queued in the same transaction as the changes
+            new_changes = db.apply_scan(announcements, detect_removals=detect_removals,
+                                        notify=db.is_email_enabled())
+            if detect_removals:
+                db.mark_full_scan()
             
+            page_cache.commit()
             db.set_scanning(False)
             last_auto_scan = datetime.now()
+            timings["apply_seconds"] = round(time.monotonic() - started - timings["scrape_seconds"], 3)
             
-            # Send email notification if there are changes
             if new_changes:
-                settings = db.get_settings()
-                changes_dict = [c.to_dict() for c in new_changes]
-                try:
-                    send_change_notification(changes_dict, settings)
-                except Exception as email_error:
-                    print(f"Email notification failed: {email_error}")
+                event_bus.publish("changes", {
+                    "changes": [c.to_dict() for c in new_changes[:sse_max_changes]],
+                    "total": len(new_changes),
+                })
+            event_bus.publish("scan_completed", {"full": full, "changes": len(new_changes), "error": None})
+            publish_status()
+            
+            if new_changes:
+                outbox_sender.wake()
             
+            timings["total_seconds"] = round(time.monotonic() - started, 3)
             return new_changes
             
         except Exception as e:
+            page_cache.discard()
             db.set_scanning(False, str(e))
             print(f"Scan error: {e}")
+            timings["error"] = str(e)
+            timings["total_seconds"] = round(time.monotonic() - started, 3)
+            event_bus.publish("scan_completed", {"full": full, "changes": 0, "error": str(e)})
+            publish_status()
             return []
 
 
-def auto_scan_worker():
-    """Background worker for automatic scanning"""
-    global next_auto_scan_time
-    
-    interval = get_auto_scan_interval()
-    print(f"Auto-scan worker started. Interval: {interval} seconds")
-    
-    while auto_scan_enabled:
-        try:
-            # Get current interval from settings
-            interval = get_auto_scan_interval()
-            
-            # Set the next scan time BEFORE sleeping so frontend knows when it will happen
-            # Use UTC to avoid timezone confusion with frontend
-            next_auto_scan_time = datetime.now(timezone.utc) + timedelta(seconds=interval)
-            print(f"Next auto-scan scheduled for: {next_auto_scan_time.isoformat()}")
-            
-            # Wait for the interval
-            time.sleep(interval)
-            
-            if not auto_scan_enabled:
-                break
-                
-            # Check if not already scanning
-            status = db.get_scan_status()
-            if not status["is_scanning"]:
-                print(f"[{datetime.now()}] Starting auto-scan...")
-                changes = perform_scan()
-                print(f"[{datetime.now()}] Auto-scan complete. Changes detected: {len(changes)}")
-                
-        except Exception as e:
-            print(f"Auto-scan error: {e}")
+def run_scan_job(job: ScanJob):
+    """Execute a queued scan job; called on the scan queue worker thread"""
+    timings = {}
+    changes = perform_scan(full=job.full, timings=timings)
+    return len(changes), timings.pop("error", None), timings
+
+
+# Every scan, manual or automatic, runs through this queue's single worker
+scan_queue = ScanQueue(db, run_scan_job, on_update=lambda job: event_bus.publish("scan_job", job.to_dict()))
+
+
+def run_auto_scan():
+    """Queue an automatic scan and wait for it; joins a manual scan that is already waiting"""
+    print(f"[{datetime.now()}] Starting auto-scan...")
+    job, _ = scan_queue.submit(trigger="auto")
+    job = scan_queue.wait(job.id)
+    print(f"[{datetime.now()}] Auto-scan complete. Changes detected: {job.changes_count}")
+
+
+# Automatic scans: fixed-rate keeps a steady period regardless of scan
+# duration, fixed-delay waits a full interval after each scan
+auto_scan_scheduler = ScanScheduler(
+    run_auto_scan,
+    get_auto_scan_interval,
+    mode=os.getenv("AUTO_SCAN_MODE", "fixed-rate"),
+    jitter=float(os.getenv("AUTO_SCAN_JITTER", 0)),
+    missed_runs=os.getenv("AUTO_SCAN_MISSED_RUNS", "run-once"),
+    on_schedule=lambda next_run: publish_status(),
+)
+
+
+def versioned(extra=None):
+    """
+    Serve a read endpoint with an ETag derived from the database data version.
+
+    A request whose If-None-Match still matches gets a 304 before the view
+    runs, so polling between scans costs no database work. `extra` returns
+    any in-memory state the response depends on besides the database.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            # Read before the view runs: a write that lands meanwhile only
+            # makes the next request miss, never serves stale data as current
+            key = f"{request.full_path}|{extra() if extra else ''}"
+            etag = f"{db.data_version}-{hashlib.sha1(key.encode()).hexdigest()[:12]}"
+            if etag in request.if_none_match:
+                response = Response(status=304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag)
+            # Let browsers keep the body but revalidate on every poll
+            response.headers["Cache-Control"] = "no-cache"
+            return response
+        return wrapper
+    return decorator
 
 
 @app.route("/api/status", methods=["GET"])
+# changes_today resets at local midnight without a database write, so the date is part of the ETag
+@versioned(extra=lambda: (auto_scan_scheduler.enabled, auto_scan_scheduler.next_run,
+                          datetime.now().date().isoformat()))
 def get_status():
     """Get the current scan status"""
-    status = db.get_scan_status()
-    interval = get_auto_scan_interval()
-    status["auto_scan_enabled"] = auto_scan_enabled
-    status["auto_scan_interval"] = interval
-    status["next_auto_scan"] = next_auto_scan_time.isoformat() if next_auto_scan_time else None
+    return jsonify(current_status())
+
+
+@app.route("/api/events", methods=["GET"])
+def stream_events():
+    """
+    Server-Sent Events stream of scan and change events.
+
+    Events: `status` (same body as /api/status), `scan_started`,
+    `scan_progress` (one per scraped page), `changes` (a scan's detected
+    changes, at most SSE_MAX_CHANGES of them, plus their total),
+    `scan_completed`, `scan_job` (queue state changes), and `resync` when a
+    client missed more than can be replayed or delivered.
+    """
+    last_event_id = request.headers.get("Last-Event-ID", None, type=int)
+    
+    def generate():
+        # Subscribed only once streaming starts, so the finally always runs
+        subscriber, replay = event_bus.subscribe(last_event_id)
+        try:
+            # Tell EventSource how soon to reconnect, then send the current state
+            yield "retry: 5000\n\n"
+            yield EventBus.format_message("status", current_status())
+            for message in replay:
+                yield message
+            while True:
+                try:
+                    message = subscriber.get(timeout=sse_keepalive)
+                except queue.Empty:
+                    yield ": keepalive\n\n"
+                    continue
+                if message is None:
+                    return
+                yield message
+        finally:
+            event_bus.unsubscribe(subscriber)
     
-    return jsonify(status)
+    return Response(generate(), mimetype="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        # Stop reverse proxies from buffering the stream
+        "X-Accel-Buffering": "no",
+    })
+
+
+def to_db_timestamp(value: Optional[str]) -> Optional[str]:
+    """Normalise an ISO timestamp to the naive local-time format stored in the DB"""
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone().replace(tzinfo=None)
+    return parsed.isoformat()
+
+
+def encode_cursor(payload: dict) -> str:
+    """Opaque pagination cursor for list endpoints"""
+    data = json.dumps(payload, separators=(",", ":"))
+    return base64.urlsafe_b64encode(data.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str]) -> dict:
+    """Payload of a cursor made by encode_cursor ({} when there is none)"""
+    if not cursor:
+        return {}
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except ValueError:
+        raise ValueError("Invalid cursor")
+    if not isinstance(payload, dict):
+        raise ValueError("Invalid cursor")
+    return payload
+
+
+def decode_change_cursor(cursor: Optional[str]) -> Tuple[Optional[int], Optional[str], Optional[str]]:
+    """Return (before_id, since, change_type) from a change log cursor"""
+    payload = decode_cursor(cursor)
+    if not payload:
+        return None, None, None
+    before_id = payload.get("before_id")
+    since = payload.get("since")
+    change_type = payload.get("change_type")
+    if (not isinstance(before_id, int) or not (since is None or isinstance(since, str))
+            or not (change_type is None or isinstance(change_type, str))):
+        raise ValueError("Invalid cursor")
+    return before_id, since, change_type
+
+
+def change_page_response(changes, next_before_id, since: Optional[str] = None,
+                         change_type: Optional[str] = None):
+    """JSON list of changes; the next page's cursor goes in X-Next-Cursor"""
+    response = jsonify([c.to_dict() for c in changes])
+    if next_before_id is not None:
+        # The cursor carries the filters so later pages stay consistent
+        response.headers["X-Next-Cursor"] = encode_cursor(
+            {"before_id": next_before_id, "since": since, "change_type": change_type}
+        )
+    return response
 
 
 @app.route("/api/announcements", methods=["GET"])
+@versioned()
 def get_announcements():
-    """Get all tracked announcements"""
-    announcements = db.get_all_announcements()
-    return jsonify([a.to_dict() for a in announcements])
+    """
+    Get tracked announcements.
+
+    Query parameters: `fields` (comma separated projection), `sort`
+    (last_seen, first_seen or id), `order` (asc/desc), `status`, and `limit`
+    plus `cursor` for keyset pages. Without `limit` every row is streamed
+    from the database cursor, as a JSON array or, with `format=ndjson`, as
+    newline-delimited JSON.
+    """
+    fields = [f.strip() for f in request.args.get("fields", "").split(",") if f.strip()]
+    sort = request.args.get("sort", "last_seen")
+    descending = request.args.get("order", "desc").lower() != "asc"
+    status = request.args.get("status", None)
+    limit = request.args.get("limit", None, type=int)
+    ndjson = request.args.get("format", "json") == "ndjson"
+    
+    # Validate up front; errors cannot be reported once streaming has started
+    unknown = set(fields) - set(ANNOUNCEMENT_FIELDS)
+    if unknown:
+        return jsonify({"error": f"Unknown fields: {', '.join(sorted(unknown))}"}), 400
+    if sort not in ANNOUNCEMENT_SORT_COLUMNS:
+        return jsonify({"error": f"Cannot sort by {sort}"}), 400
+    try:
+        payload = decode_cursor(request.args.get("cursor", None))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    after = None
+    if payload:
+        if payload.get("sort") != sort or payload.get("desc") != descending:
+            return jsonify({"error": "Cursor does not match the requested sort order"}), 400
+        after = payload.get("after")
+        # (sort value, id): timestamps are ISO strings, ids are integers
+        sort_type = int if sort == "id" else str
+        if (not isinstance(after, list) or len(after) != 2
+                or not all(isinstance(value, expected) and not isinstance(value, bool)
+                           for value, expected in zip(after, (sort_type, int)))):
+            return jsonify({"error": "Invalid cursor"}), 400
+        after = tuple(after)
+    
+    fields = fields or list(ANNOUNCEMENT_FIELDS)
+    
+    def project(row: dict) -> dict:
+        return {field: row[field] for field in fields}
+    
+    query = dict(fields=fields, sort=sort, descending=descending, status=status, after=after)
+    
+    if limit is not None:
+        # One bounded page; an extra row tells whether there is a next one
+        limit = min(max(limit, 1), MAX_PAGE_SIZE)
+        rows = list(db.iter_announcements(limit=limit + 1, **query))
+        page = rows[:limit]
+        if ndjson:
+            response = Response("".join(json.dumps(project(row)) + "\n" for row in page),
+                                mimetype="application/x-ndjson")
+        else:
+            response = jsonify([project(row) for row in page])
+        if len(rows) > limit:
+            last = page[-1]
+            response.headers["X-Next-Cursor"] = encode_cursor(
+                {"sort": sort, "desc": descending, "after": [last[sort], last["id"]]}
+            )
+        return response
+    
+    def generate():
+        rows = db.iter_announcements(**query)
+        if ndjson:
+            for row in rows:
+                yield json.dumps(project(row)) + "\n"
+            return
+        yield "["
+        for i, row in enumerate(rows):
+            yield ("," if i else "") + json.dumps(project(row))
+        yield "]"
+    
+    return Response(generate(), mimetype="application/x-ndjson" if ndjson else "application/json")
 
 
 @app.route("/api/changes", methods=["GET"])
+@versioned()
 def get_changes():
-    """Get all detected changes"""
-    limit = request.args.get("limit", 50, type=int)
-    since = request.args.get("since", None)  # ISO timestamp to get changes since
-    changes = db.get_all_changes(limit=limit)
-    
-    # Filter by timestamp if provided
-    if since:
-        try:
-            since_dt = datetime.fromisoformat(since)
-            changes = [c for c in changes if c.detected_at and c.detected_at > since_dt]
-        except ValueError:
-            pass
+    """
+    Get detected changes, most recent first, one page at a time.
+
+    The X-Next-Cursor cursor keeps `since` and `change_type`; query
+    parameters given alongside a cursor take precedence.
+    """
+    limit = min(max(request.args.get("limit", 50, type=int), 1), MAX_PAGE_SIZE)
+    try:
+        since = to_db_timestamp(request.args.get("since", None))  # ISO timestamp to get changes since
+        before_id, cursor_since, cursor_change_type = decode_change_cursor(request.args.get("cursor", None))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    since = since or cursor_since
+    change_type = request.args.get("change_type", None) or cursor_change_type
     
-    return jsonify([c.to_dict() for c in changes])
+    changes, next_before_id = db.get_changes_page(
+        since=since, before_id=before_id, change_type=change_type, limit=limit
+    )
+    return change_page_response(changes, next_before_id, since=since, change_type=change_type)
 
 
 @app.route("/api/changes/recent", methods=["GET"])
 def get_recent_changes():
-    """Get changes detected in the last scan"""
+    """Get changes detected in the last `minutes` minutes, one capped page at a time"""
     minutes = request.args.get("minutes", 1, type=int)
-    changes = db.get_all_changes(limit=100)
-    
-    # Filter to recent changes
-    cutoff = datetime.now().timestamp() - (minutes * 60)
-    recent = [c for c in changes if c.detected_at and c.detected_at.timestamp() > cutoff]
+    limit = min(max(request.args.get("limit", MAX_PAGE_SIZE, type=int), 1), MAX_PAGE_SIZE)
+    try:
+        before_id, cursor_since, _ = decode_change_cursor(request.args.get("cursor", None))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     
-    return jsonify([c.to_dict() for c in recent])
+    # Later pages keep the window of the first request
+    since = cursor_since or (datetime.now() - timedelta(minutes=minutes)).isoformat()
+    changes, next_before_id = db.get_changes_page(since=since, before_id=before_id, limit=limit)
+    return change_page_response(changes, next_before_id, since=since)
 
 
 @app.route("/api/scan", methods=["POST"])
 def trigger_scan():
-    """Trigger a new scan"""
-    # Check if already scanning
-    status = db.get_scan_status()
-    if status["is_scanning"]:
-        return jsonify({"error": "Scan already in progress"}), 409
-    
-    # Run scan in background thread
-    def run_scan():
-        changes = perform_scan()
-        print(f"Manual scan complete. Changes detected: {len(changes)}")
-    
-    thread = threading.Thread(target=run_scan)
-    thread.start()
+    """Queue a scan; requests made while one is already waiting join that job"""
+    # Optional {"full": true} forces a full crawl with removal detection
+    data = request.get_json(silent=True) or {}
+    full = True if data.get("full") else None
     
-    return jsonify({"message": "Scan started"})
+    job, created = scan_queue.submit(trigger="manual", full=full)
+    return jsonify({
+        "message": "Scan queued" if created else "Scan already queued",
+        "job": job.to_dict(),
+    }), 202
+
+
+@app.route("/api/scans/<int:job_id>", methods=["GET"])
+def get_scan_job(job_id: int):
+    """Get a scan job's state, outcome and timings"""
+    job = db.get_scan_job(job_id)
+    if job is None:
+        return jsonify({"error": "Scan job not found"}), 404
+    return jsonify(job.to_dict())
 
 
 @app.route("/api/auto-scan", methods=["POST"])
 def toggle_auto_scan():
     """Toggle auto-scan on/off"""
-    global auto_scan_enabled
-    
     data = request.get_json() or {}
-    enabled = data.get("enabled", not auto_scan_enabled)
-    auto_scan_enabled = enabled
+    enabled = data.get("enabled", not auto_scan_scheduler.enabled)
+    # The scheduler wakes up and reports the new state itself
+    auto_scan_scheduler.set_enabled(bool(enabled))
     
     return jsonify({
-        "auto_scan_enabled": auto_scan_enabled,
+        "auto_scan_enabled": auto_scan_scheduler.enabled,
         "auto_scan_interval": get_auto_scan_interval()
     })
 
@@ -267,6 +612,11 @@ def update_settings():
         data["smtp_password"] = current_settings.get("smtp_password", "")
     
     db.update_settings(data)
+    # Exchange sessions were opened with the previous credentials
+    invalidate_accounts()
+    # A new refresh interval applies to the pending wait straight away
+    auto_scan_scheduler.reschedule()
+    publish_status()
     
     # Return updated settings (with masked password)
     updated = db.get_settings()
@@ -296,7 +646,7 @@ def test_email():
     }]
     
     try:
-        success = send_change_notification(test_changes, settings)
+        success = send_change_notification(test_changes, settings, **email_options)
         if success:
             return jsonify({"message": "Test email sent successfully!"})
         else:
@@ -305,6 +655,27 @@ def test_email():
         return jsonify({"error": str(e)}), 500
 
 
+@app.route("/api/outbox", methods=["GET"])
+def get_outbox():
+    """Email outbox message counts per state and recent dead letters"""
+    return jsonify(db.get_outbox_summary())
+
+
+@app.route("/api/outbox/<int:message_id>/deliveries", methods=["GET"])
+def get_outbox_deliveries(message_id: int):
+    """Per-batch outcomes of every send attempt of a notification"""
+    return jsonify([d.to_dict() for d in db.get_deliveries(message_id)])
+
+
+@app.route("/api/outbox/<int:message_id>/retry", methods=["POST"])
+def retry_outbox_message(message_id: int):
+    """Queue a dead-lettered notification for delivery again"""
+    if not db.requeue_notification(message_id):
+        return jsonify({"error": "No dead-lettered message with that id"}), 404
+    outbox_sender.wake()
+    return jsonify({"message": "Notification queued for retry"})
+
+
 @app.route("/api/health", methods=["GET"])
 def health_check():
     """Health check endpoint"""
@@ -312,28 +683,21 @@ def health_check():
 
 
 if __name__ == "__main__":
-    # Initialize next_auto_scan_time so frontend gets a valid countdown immediately
-    # Use UTC for timezone consistency
-    interval = get_auto_scan_interval()
-    next_auto_scan_time = datetime.now(timezone.utc) + timedelta(seconds=interval)
-    
     host = os.getenv("HOST", "0.0.0.0")
     port = int(os.getenv("PORT", 5000))
     debug = os.getenv("FLASK_DEBUG", "0") == "1"
     
-    # Start auto-scan worker thread
-    auto_scan_thread = threading.Thread(target=auto_scan_worker, daemon=True)
-    auto_scan_thread.start()
+    # Fail jobs interrupted by a previous crash, then start the scan worker
+    scan_queue.start()
+    
+    # Deliver notifications left in the outbox and any queued from now on
+    outbox_sender.start()
+    
+    # Start the auto-scan scheduler; it publishes the first countdown immediately
+    auto_scan_scheduler.start()
     
     interval = get_auto_scan_interval()
     print(f"Starting PTT Site Watcher API on {host}:{port}")
     print(f"Auto-scan enabled: every {interval} seconds ({interval // 60} minutes)")
     
-    # Reset scan status on startup in case of previous crash
-    try:
-        db.set_scanning(False)
-        print("Reset scan status to 'ready'")
-    except Exception as e:
-        print(f"Warning: Could not reset scan status: {e}")
-        
     app.run(host=host, port=port, debug=debug)
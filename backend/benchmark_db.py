@@ -0,0 +1,133 @@
+"""
+Benchmark for the change log and announcement queries on a large database.
+
+Builds a throwaway database with many change rows, then times the hot
+queries with and without the indexes created by Database._init_db.
+
+    python benchmark_db.py --changes 1000000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+# Add current directory to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from database import Database
+
+INDEXES = {
+    "idx_changes_detected_at": "CREATE INDEX idx_changes_detected_at ON changes (detected_at)",
+    "idx_changes_type_detected": "CREATE INDEX idx_changes_type_detected ON changes (change_type, detected_at, id)",
+    "idx_changes_type_announcement": "CREATE INDEX idx_changes_type_announcement ON changes (change_type, announcement_id)",
+    "idx_announcements_last_seen": "CREATE INDEX idx_announcements_last_seen ON announcements (last_seen)",
+}
+
+QUERIES = {
+    "latest changes (ORDER BY detected_at DESC LIMIT 50)":
+        ("SELECT * FROM changes ORDER BY detected_at DESC LIMIT 50", ()),
+    "changes since a timestamp":
+        ("SELECT * FROM changes WHERE detected_at > ? ORDER BY detected_at DESC LIMIT 50", None),
+    "latest changes of one type (change log filter)":
+        ("SELECT * FROM changes WHERE change_type = 'removed' ORDER BY detected_at DESC, id DESC LIMIT 51", ()),
+    "removed changes for one announcement":
+        ("SELECT id FROM changes WHERE change_type = 'removed' AND announcement_id = ?", None),
+    "latest announcements (ORDER BY last_seen DESC LIMIT 50)":
+        ("SELECT * FROM announcements ORDER BY last_seen DESC LIMIT 50", ()),
+}
+
+
+def populate(db: Database, announcement_count: int, change_count: int):
+    """Fill the database with synthetic announcements and changes"""
+    start = datetime(2020, 1, 1)
+    step = timedelta(days=5 * 365) / change_count
+    change_types = ["new", "modified", "modified", "removed"]
+
+    with db._get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.executemany(
+            """INSERT INTO announcements (title, date_text, link, content_hash, first_seen, last_seen)
+               VALUES (?, ?, ?, ?, ?, ?)""",
+            (
+                (f"Announcement {i}", "1 Ocak 2024", f"/duyuru/{i}", f"{i:032x}",
+                 start.isoformat(), (start + step * random.randrange(change_count)).isoformat())
+                for i in range(announcement_count)
+            )
+        )
+        cursor.executemany(
+            """INSERT INTO changes (announcement_id, change_type, detected_at, title, old_content, new_content)
+               VALUES (?, ?, ?, ?, ?, ?)""",
+            (
+                (random.randrange(1, announcement_count + 1), random.choice(change_types),
+                 (start + step * i).isoformat(), f"Announcement {i}", "old|content", "new|content")
+                for i in range(change_count)
+            )
+        )
+        conn.commit()
+
+
+def time_queries(db: Database, announcement_count: int, repeat: int) -> dict:
+    """Median latency in milliseconds for each benchmark query"""
+    results = {}
+    with db._get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT MAX(detected_at) AS latest FROM changes")
+        latest = datetime.fromisoformat(cursor.fetchone()["latest"])
+
+        for name, (sql, params) in QUERIES.items():
+            timings = []
+            for _ in range(repeat):
+                if params is None and "detected_at > ?" in sql:
+                    args = ((latest - timedelta(hours=random.randint(1, 48))).isoformat(),)
+                elif params is None:
+                    args = (random.randrange(1, announcement_count + 1),)
+                else:
+                    args = params
+                started = time.perf_counter()
+                cursor.execute(sql, args).fetchall()
+                timings.append((time.perf_counter() - started) * 1000)
+            timings.sort()
+            results[name] = timings[len(timings) // 2]
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--changes", type=int, default=1_000_000, help="number of change rows")
+    parser.add_argument("--announcements", type=int, default=20_000, help="number of announcements")
+    parser.add_argument("--repeat", type=int, default=20, help="runs per query (median is reported)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, "benchmark.db"))
+
+        print(f"Populating {args.announcements} announcements and {args.changes} changes...")
+        started = time.perf_counter()
+        populate(db, args.announcements, args.changes)
+        print(f"Populated in {time.perf_counter() - started:.1f}s")
+
+        with db._get_connection() as conn:
+            for name in INDEXES:
+                conn.execute(f"DROP INDEX IF EXISTS {name}")
+            conn.commit()
+        without_indexes = time_queries(db, args.announcements, args.repeat)
+
+        with db._get_connection() as conn:
+            for sql in INDEXES.values():
+                conn.execute(sql)
+            conn.execute("ANALYZE")
+            conn.commit()
+        with_indexes = time_queries(db, args.announcements, args.repeat)
+
+        db.close()
+
+    print(f"\n{'Query':<58} {'no index':>12} {'indexed':>12}")
+    for name in QUERIES:
+        print(f"{name:<58} {without_indexes[name]:>10.2f}ms {with_indexes[name]:>10.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+"""
+Long-lived Playwright browser pool shared by all scans
+"""
+import asyncio
+import atexit
+import threading
+from contextlib import asynccontextmanager
+from typing import List, Optional
+
+from playwright.async_api import async_playwright, Browser, BrowserContext
+
+
+class BrowserLease:
+    """A browser context borrowed from the pool for the duration of one scan"""
+
+    def __init__(self, context: BrowserContext):
+        self.context = context
+        self.pages_loaded = 0
+        self.healthy = True
+
+    def mark_page_loaded(self):
+        """Count a page navigation towards the browser recycling budget"""
+        self.pages_loaded += 1
+
+    def invalidate(self):
+        """Mark the context as broken so the pool discards it on return"""
+        self.healthy = False
+
+
+class BrowserPool:
+    """
+    Keeps a single Chromium instance alive across scans.
+
+    Playwright objects are bound to the event loop that created them, so the
+    pool runs its own loop in a daemon thread and every scan is executed on
+    that loop. Contexts are reused between scans (keeping cookie consent) and
+    the browser is relaunched after `max_pages` navigations or when it crashes.
+    """
+
+    def __init__(self, headless: bool = True, max_pages: int = 200, max_idle_contexts: int = 2):
+        self.headless = headless
+        self.max_pages = max_pages
+        self.max_idle_contexts = max_idle_contexts
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+
+        self._playwright = None
+        self._browser: Optional[Browser] = None
+        self._idle_contexts: List[BrowserContext] = []
+        self._borrowed = 0
+        self._pages_served = 0
+        self._launch_lock: Optional[asyncio.Lock] = None
+
+    # ------------------------------------------------------------------
+    # Event loop plumbing
+    # ------------------------------------------------------------------
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._start_lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                ready = threading.Event()
+
+                def run():
+                    asyncio.set_event_loop(loop)
+                    loop.call_soon(ready.set)
+                    loop.run_forever()
+
+                self._thread = threading.Thread(target=run, name="browser-pool", daemon=True)
+                self._thread.start()
+                ready.wait()
+                self._loop = loop
+            return self._loop
+
+    def run(self, coro):
+        """Run a coroutine on the pool's event loop and block until it finishes"""
+        loop = self._ensure_loop()
+        return asyncio.run_coroutine_threadsafe(coro, loop).result()
+
+    async def call(self, coro):
+        """Await a coroutine on the pool's event loop from any event loop"""
+        loop = self._ensure_loop()
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            return await coro
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, loop))
+
+    # ------------------------------------------------------------------
+    # Browser lifecycle (only called on the pool loop)
+    # ------------------------------------------------------------------
+
+    def _is_healthy(self) -> bool:
+        return self._browser is not None and self._browser.is_connected()
+
+    async def _get_browser(self) -> Browser:
+        if self._launch_lock is None:
+            self._launch_lock = asyncio.Lock()
+
+        async with self._launch_lock:
+            recycle_due = self._pages_served >= self.max_pages and self._borrowed == 0
+            if self._browser is not None and (recycle_due or not self._is_healthy()):
+                reason = "page budget reached" if recycle_due else "browser disconnected"
+                print(f"Recycling browser ({reason}, {self._pages_served} pages served)")
+                await self._close_browser()
+
+            if self._browser is None:
+                if self._playwright is None:
+                    self._playwright = await async_playwright().start()
+                print("Launching pooled Chromium browser...")
+                self._browser = await self._playwright.chromium.launch(headless=self.headless)
+                self._pages_served = 0
+
+            return self._browser
+
+    async def _close_browser(self):
+        for context in self._idle_contexts:
+            try:
+                await context.close()
+            except Exception:
+                pass
+        self._idle_contexts = []
+
+        if self._browser is not None:
+            try:
+                await self._browser.close()
+            except Exception:
+                pass
+            self._browser = None
+
+    async def _new_context(self, browser: Browser) -> BrowserContext:
+        return await browser.new_context(
+            viewport={"width": 1280, "height": 720},
+            locale="tr-TR"
+        )
+
+    @asynccontextmanager
+    async def acquire(self):
+        """Borrow a browser context; must be used on the pool loop (see `call`)"""
+        browser = await self._get_browser()
+
+        # Idle contexts are dropped whenever the browser is relaunched, so any
+        # context still parked here belongs to the current browser
+        if self._idle_contexts:
+            context = self._idle_contexts.pop()
+        else:
+            context = await self._new_context(browser)
+
+        lease = BrowserLease(context)
+        self._borrowed += 1
+        try:
+            yield lease
+        except Exception:
+            lease.invalidate()
+            raise
+        finally:
+            self._borrowed -= 1
+            self._pages_served += lease.pages_loaded
+            await self._release(lease, browser)
+
+    async def _release(self, lease: BrowserLease, browser: Browser):
+        context = lease.context
+        keep = (
+            lease.healthy
+            and browser is self._browser
+            and self._is_healthy()
+            and self._pages_served < self.max_pages
+            and len(self._idle_contexts) < self.max_idle_contexts
+        )
+
+        if keep:
+            # Drop any tabs the scan left behind before parking the context
+            for page in list(context.pages):
+                try:
+                    await page.close()
+                except Exception:
+                    pass
+            self._idle_contexts.append(context)
+        else:
+            try:
+                await context.close()
+            except Exception:
+                pass
+
+    async def _shutdown(self):
+        await self._close_browser()
+        if self._playwright is not None:
+            await self._playwright.stop()
+            self._playwright = None
+
+    def close(self):
+        """Close the browser and stop the pool's event loop"""
+        if self._loop is None:
+            return
+        try:
+            self.run(self._shutdown())
+        except Exception as e:
+            print(f"Error shutting down browser pool: {e}")
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        self._loop = None
+        self._thread = None
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_browser_pool(headless: bool = True, max_pages: Optional[int] = None) -> BrowserPool:
+    """Return the process-wide pool for the given headless mode"""
+    with _pools_lock:
+        pool = _pools.get(headless)
+        if pool is None:
+            pool = BrowserPool(headless=headless)
+            _pools[headless] = pool
+        if max_pages is not None:
+            pool.max_pages = max_pages
+        return pool
+
+
+@atexit.register
+def _close_pools():
+    for pool in list(_pools.values()):
+        pool.close()
@@ -3,26 +3,102 @@ SQLite database operations for PTT Site Watcher
 """
 import sqlite3
 import hashlib
+import json
+import queue
+import threading
 from datetime import datetime
-from typing import List, Optional
+from typing import Dict, Iterator, List, Optional, Tuple
 from contextlib import contextmanager
 
-from models import Announcement, Change
+from models import Announcement, Change, EmailDelivery, OutboxMessage, ScanJob
+
+
+# Columns that /api/announcements may project, and the indexed ones it may sort by
+ANNOUNCEMENT_FIELDS = (
+    "id", "title", "date_text", "link", "content_hash",
+    "first_seen", "last_seen", "status", "removed_at",
+)
+ANNOUNCEMENT_SORT_COLUMNS = ("last_seen", "first_seen", "id")
 
 
 class Database:
-    def __init__(self, db_path: str = "ptt_watcher.db"):
+    # Links per IN (...) query, well below SQLite's host parameter limit
+    QUERY_CHUNK_SIZE = 500
+
+    def __init__(self, db_path: str = "ptt_watcher.db", pool_size: int = 8,
+                 busy_timeout_ms: int = 5000, cache_size_kib: int = 16384,
+                 watch_external_changes: bool = False):
         self.db_path = db_path
+        self.busy_timeout_ms = busy_timeout_ms
+        self.cache_size_kib = cache_size_kib
+        # Idle connections shared by the scan thread and Flask request threads
+        self._pool: queue.LifoQueue = queue.LifoQueue(maxsize=pool_size)
+        # Connection currently checked out by each thread, for nested calls
+        self._local = threading.local()
+        # Bumped by every committed write; read endpoints use it as their ETag
+        self._data_version = 0
+        self._version_lock = threading.Lock()
+        # Settings row kept in memory until update_settings changes it. With
+        # watch_external_changes, writes by other processes (seen through
+        # PRAGMA data_version on a dedicated connection) also invalidate it
+        # and make the data version catch up with the persisted one
+        self._settings: Optional[dict] = None
+        self._settings_lock = threading.Lock()
+        self.watch_external_changes = watch_external_changes
+        self._watch_conn: Optional[sqlite3.Connection] = None
+        self._watch_version: Optional[int] = None
         self._init_db()
 
+    def _connect(self) -> sqlite3.Connection:
+        # Connections move between threads through the pool but are only
+        # ever used by one thread at a time
+        conn = sqlite3.connect(self.db_path, timeout=self.busy_timeout_ms / 1000, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        # WAL lets request threads keep reading while a scan is writing
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+        conn.execute(f"PRAGMA cache_size=-{int(self.cache_size_kib)}")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        return conn
+
     @contextmanager
     def _get_connection(self):
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
+        # Nested calls on the same thread share the outer connection
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            yield conn
+            return
+
+        try:
+            conn = self._pool.get_nowait()
+        except queue.Empty:
+            conn = self._connect()
+
+        self._local.conn = conn
         try:
             yield conn
         finally:
-            conn.close()
+            self._local.conn = None
+            # Uncommitted work is discarded, as closing a connection used to do
+            if conn.in_transaction:
+                conn.rollback()
+            try:
+                self._pool.put_nowait(conn)
+            except queue.Full:
+                conn.close()
+
+    def close(self):
+        """Close all idle pooled connections"""
+        with self._settings_lock:
+            if self._watch_conn is not None:
+                self._watch_conn.close()
+                self._watch_conn = None
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                break
 
     def _init_db(self):
         """Initialize the database schema"""
@@ -38,7 +114,9 @@ class Database:
                     link TEXT NOT NULL UNIQUE,
                     content_hash TEXT NOT NULL,
                     first_seen TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    last_seen TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                    last_seen TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    status TEXT NOT NULL DEFAULT 'active',
+                    removed_at TIMESTAMP
                 )
             """)
             
@@ -56,15 +134,57 @@ class Database:
                 )
             """)
             
+            # Announcements with a 'removed' change used to be tracked only through
+            # the changes table; carry that state over into the status column
+            self._add_column_if_missing(cursor, "announcements", "removed_at", "TIMESTAMP")
+            if self._add_column_if_missing(cursor, "announcements", "status", "TEXT NOT NULL DEFAULT 'active'"):
+                cursor.execute("""
+                    UPDATE announcements SET
+                        status = 'removed',
+                        removed_at = (
+                            SELECT MAX(detected_at) FROM changes
+                            WHERE change_type = 'removed' AND announcement_id = announcements.id
+                        )
+                    WHERE id IN (
+                        SELECT announcement_id FROM changes WHERE change_type = 'removed'
+                    )
+                """)
+            
+            # Indexes for time-ordered change queries, the change log filtered by
+            # type (matches its ORDER BY and keyset columns, so no sort is needed),
+            # per-announcement change lookups and announcement listing
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_changes_detected_at ON changes (detected_at)")
+            cursor.execute(
+                "CREATE INDEX IF NOT EXISTS idx_changes_type_detected ON changes (change_type, detected_at, id)"
+            )
+            cursor.execute(
+                "CREATE INDEX IF NOT EXISTS idx_changes_type_announcement ON changes (change_type, announcement_id)"
+            )
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_announcements_last_seen ON announcements (last_seen)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_announcements_first_seen ON announcements (first_seen)")
+            
             # Scan status table
             cursor.execute("""
                 CREATE TABLE IF NOT EXISTS scan_status (
                     id INTEGER PRIMARY KEY CHECK (id = 1),
                     last_scan TIMESTAMP,
                     is_scanning INTEGER DEFAULT 0,
-                    error TEXT
+                    error TEXT,
+                    last_full_scan TIMESTAMP,
+                    data_version INTEGER NOT NULL DEFAULT 0,
+                    announcement_count INTEGER NOT NULL DEFAULT 0,
+                    active_count INTEGER NOT NULL DEFAULT 0,
+                    removed_count INTEGER NOT NULL DEFAULT 0,
+                    changes_today INTEGER NOT NULL DEFAULT 0,
+                    changes_day TEXT
                 )
             """)
+            self._add_column_if_missing(cursor, "scan_status", "last_full_scan", "TIMESTAMP")
+            self._add_column_if_missing(cursor, "scan_status", "data_version", "INTEGER NOT NULL DEFAULT 0")
+            # Counters kept up to date by the write paths, so status is one row lookup
+            for column in ("announcement_count", "active_count", "removed_count", "changes_today"):
+                self._add_column_if_missing(cursor, "scan_status", column, "INTEGER NOT NULL DEFAULT 0")
+            self._add_column_if_missing(cursor, "scan_status", "changes_day", "TEXT")
             
             # Initialize scan status if not exists
             cursor.execute("""
@@ -83,9 +203,18 @@ class Database:
                     smtp_server TEXT DEFAULT 'smtp.office365.com',
                     smtp_port INTEGER DEFAULT 587,
                     smtp_username TEXT DEFAULT '',
-                    smtp_password TEXT DEFAULT ''
+                    smtp_password TEXT DEFAULT '',
+                    digest_window_minutes INTEGER DEFAULT 0,
+                    digest_max_changes INTEGER DEFAULT 50,
+                    recipient_hourly_limit INTEGER DEFAULT 0
                 )
             """)
+            # Notification batching: collect changes for N minutes (0 sends
+            # after every scan) or until M changes, and cap mails per
+            # recipient per hour (0 is unlimited)
+            self._add_column_if_missing(cursor, "settings", "digest_window_minutes", "INTEGER DEFAULT 0")
+            self._add_column_if_missing(cursor, "settings", "digest_max_changes", "INTEGER DEFAULT 50")
+            self._add_column_if_missing(cursor, "settings", "recipient_hourly_limit", "INTEGER DEFAULT 0")
             
             # Initialize settings if not exists
             cursor.execute("""
@@ -93,32 +222,227 @@ class Database:
                 VALUES (1, 600, 0, '', '[]')
             """)
             
+            # Scan requests, executed one at a time by the scan queue worker
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS scan_jobs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    state TEXT NOT NULL DEFAULT 'queued',
+                    trigger TEXT NOT NULL,
+                    full_scan INTEGER,
+                    requested_at TIMESTAMP NOT NULL,
+                    started_at TIMESTAMP,
+                    finished_at TIMESTAMP,
+                    request_count INTEGER NOT NULL DEFAULT 1,
+                    changes_count INTEGER,
+                    error TEXT,
+                    timings TEXT
+                )
+            """)
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_scan_jobs_state ON scan_jobs (state, id)")
+            
+            # Change notifications, written with the changes and sent by the outbox worker
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS email_outbox (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    state TEXT NOT NULL DEFAULT 'pending',
+                    payload TEXT NOT NULL,
+                    created_at TIMESTAMP NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    next_attempt_at TIMESTAMP,
+                    sent_at TIMESTAMP,
+                    last_error TEXT,
+                    recipients TEXT
+                )
+            """)
+            # NULL recipients means everyone configured; set for deferred copies
+            self._add_column_if_missing(cursor, "email_outbox", "recipients", "TEXT")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_email_outbox_due ON email_outbox (state, next_attempt_at)")
+            
+            # One row per recipient per sent notification, for rate limiting
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS email_sends (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    outbox_id INTEGER,
+                    recipient TEXT NOT NULL,
+                    sent_at TIMESTAMP NOT NULL,
+                    FOREIGN KEY (outbox_id) REFERENCES email_outbox(id)
+                )
+            """)
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_email_sends_recipient ON email_sends (recipient, sent_at)")
+            
+            # Outcome of every recipient batch of every send attempt
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS email_deliveries (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    outbox_id INTEGER NOT NULL,
+                    attempt INTEGER NOT NULL,
+                    batch INTEGER NOT NULL,
+                    to_recipients TEXT NOT NULL,
+                    bcc_recipients TEXT NOT NULL,
+                    state TEXT NOT NULL,
+                    error TEXT,
+                    seconds REAL,
+                    finished_at TIMESTAMP NOT NULL,
+                    FOREIGN KEY (outbox_id) REFERENCES email_outbox(id)
+                )
+            """)
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_email_deliveries_outbox ON email_deliveries (outbox_id, id)")
+            
+            cursor.execute("SELECT data_version FROM scan_status WHERE id = 1")
+            self._data_version = cursor.fetchone()["data_version"]
+            
+            # Resync the counters once per start, in case anything wrote the
+            # tables without going through this class
+            self._recount(cursor, datetime.now())
+            
             conn.commit()
 
+    @property
+    def data_version(self) -> int:
+        """
+        Monotonic counter of committed writes. Answered from memory, except
+        that with watch_external_changes a PRAGMA on the watch connection
+        checks for commits by other processes first.
+        """
+        if self.watch_external_changes:
+            with self._settings_lock:
+                self._sync_external_changes()
+        return self._data_version
+
+    def _commit(self, conn):
+        """Commit a write transaction and bump the data version"""
+        cursor = conn.cursor()
+        cursor.execute("UPDATE scan_status SET data_version = data_version + 1 WHERE id = 1")
+        cursor.execute("SELECT data_version FROM scan_status WHERE id = 1")
+        version = cursor.fetchone()["data_version"]
+        conn.commit()
+        # Only published once committed, so a reader that sees the new
+        # version can never have cached the old data under it
+        with self._version_lock:
+            self._data_version = max(self._data_version, version)
+
+    @staticmethod
+    def _recount(cursor, now: datetime):
+        today = now.date().isoformat()
+        cursor.execute("""
+            UPDATE scan_status SET
+                announcement_count = (SELECT COUNT(*) FROM announcements),
+                active_count = (SELECT COUNT(*) FROM announcements WHERE status = 'active'),
+                removed_count = (SELECT COUNT(*) FROM announcements WHERE status = 'removed'),
+                changes_today = (SELECT COUNT(*) FROM changes WHERE detected_at >= ?),
+                changes_day = ?
+            WHERE id = 1
+        """, (today, today))
+
+    def refresh_counts(self):
+        """Recount the status counters from the tables, after writes made outside this class"""
+        with self._get_connection() as conn:
+            self._recount(conn.cursor(), datetime.now())
+            self._commit(conn)
+
+    @staticmethod
+    def _adjust_counts(cursor, now: datetime, added: int = 0, reactivated: int = 0,
+                       removed: int = 0, changes: int = 0):
+        """Apply a write's effect to the status counters inside its transaction"""
+        today = now.date().isoformat()
+        cursor.execute("""
+            UPDATE scan_status SET
+                announcement_count = announcement_count + ?,
+                active_count = active_count + ?,
+                removed_count = removed_count + ?,
+                changes_today = CASE WHEN changes_day = ? THEN changes_today + ? ELSE ? END,
+                changes_day = ?
+            WHERE id = 1
+        """, (added, added + reactivated - removed, removed - reactivated, today, changes, changes, today))
+
+    @staticmethod
+    def _add_column_if_missing(cursor, table: str, column: str, definition: str) -> bool:
+        """Migrate databases created before a column was added to the schema; True if added"""
+        cursor.execute(f"PRAGMA table_info({table})")
+        if column in [row["name"] for row in cursor.fetchall()]:
+            return False
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+        return True
+
     @staticmethod
     def compute_hash(title: str, date_text: str, link: str) -> str:
         """Compute a hash for the announcement content"""
         content = f"{title}|{date_text}|{link}"
         return hashlib.md5(content.encode()).hexdigest()
 
+    @staticmethod
+    def _row_to_announcement(row) -> Announcement:
+        return Announcement(
+            id=row["id"],
+            title=row["title"],
+            date_text=row["date_text"],
+            link=row["link"],
+            content_hash=row["content_hash"],
+            first_seen=datetime.fromisoformat(row["first_seen"]) if row["first_seen"] else None,
+            last_seen=datetime.fromisoformat(row["last_seen"]) if row["last_seen"] else None,
+            status=row["status"],
+            removed_at=datetime.fromisoformat(row["removed_at"]) if row["removed_at"] else None,
+        )
+
     def get_all_announcements(self) -> List[Announcement]:
         """Get all announcements"""
         with self._get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute("SELECT * FROM announcements ORDER BY last_seen DESC")
             rows = cursor.fetchall()
-            return [
-                Announcement(
-                    id=row["id"],
-                    title=row["title"],
-                    date_text=row["date_text"],
-                    link=row["link"],
-                    content_hash=row["content_hash"],
-                    first_seen=datetime.fromisoformat(row["first_seen"]) if row["first_seen"] else None,
-                    last_seen=datetime.fromisoformat(row["last_seen"]) if row["last_seen"] else None,
-                )
-                for row in rows
-            ]
+            return [self._row_to_announcement(row) for row in rows]
+
+    def get_active_links(self) -> List[str]:
+        """Links of all announcements that are currently active"""
+        with self._get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT link FROM announcements WHERE status = 'active' AND link IS NOT NULL")
+            return [row["link"] for row in cursor.fetchall()]
+
+    def iter_announcements(self, fields: Optional[List[str]] = None, sort: str = "last_seen",
+                           descending: bool = True, status: Optional[str] = None,
+                           after: Optional[tuple] = None, limit: Optional[int] = None) -> Iterator[dict]:
+        """
+        Stream announcement rows as plain dicts straight from the cursor.
+
+        `fields` projects the output (defaults to every column), `sort` must be
+        one of ANNOUNCEMENT_SORT_COLUMNS, and `after` is the (sort value, id)
+        of the last row of the previous page. Timestamps are returned as the
+        stored ISO strings.
+        """
+        fields = list(fields or ANNOUNCEMENT_FIELDS)
+        unknown = set(fields) - set(ANNOUNCEMENT_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+        if sort not in ANNOUNCEMENT_SORT_COLUMNS:
+            raise ValueError(f"Cannot sort by {sort}")
+        
+        # The sort column and id are always selected for keyset pagination
+        columns = list(dict.fromkeys(fields + [sort, "id"]))
+        direction = "DESC" if descending else "ASC"
+        conditions = []
+        params = []
+        if status:
+            conditions.append("status = ?")
+            params.append(status)
+        if after is not None:
+            conditions.append(f"({sort}, id) {'<' if descending else '>'} (?, ?)")
+            params.extend(after)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        limit_clause = ""
+        if limit is not None:
+            limit_clause = "LIMIT ?"
+            params.append(limit)
+        
+        with self._get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                f"SELECT {', '.join(columns)} FROM announcements {where} "
+                f"ORDER BY {sort} {direction}, id {direction} {limit_clause}",
+                params
+            )
+            for row in cursor:
+                yield {field: row[field] for field in columns}
 
     def get_announcement_by_link(self, link: str) -> Optional[Announcement]:
         """Get an announcement by its link"""
@@ -127,17 +451,27 @@ class Database:
             cursor.execute("SELECT * FROM announcements WHERE link = ?", (link,))
             row = cursor.fetchone()
             if row:
-                return Announcement(
-                    id=row["id"],
-                    title=row["title"],
-                    date_text=row["date_text"],
-                    link=row["link"],
-                    content_hash=row["content_hash"],
-                    first_seen=datetime.fromisoformat(row["first_seen"]) if row["first_seen"] else None,
-                    last_seen=datetime.fromisoformat(row["last_seen"]) if row["last_seen"] else None,
-                )
+                return self._row_to_announcement(row)
             return None
 
+    def all_known(self, announcements: List[dict]) -> bool:
+        """True if every scraped item is already stored with the same content hash"""
+        if not announcements:
+            return False
+        links = [ann["link"] for ann in announcements]
+        with self._get_connection() as conn:
+            cursor = conn.cursor()
+            placeholders = ",".join(["?" for _ in links])
+            cursor.execute(
+                f"SELECT link, content_hash FROM announcements WHERE link IN ({placeholders})",
+                links
+            )
+            known = {row["link"]: row["content_hash"] for row in cursor.fetchall()}
+        return all(
+            known.get(ann["link"]) == self.compute_hash(ann["title"], ann["date_text"], ann["link"])
+            for ann in announcements
+        )
+
     def upsert_announcement(self, title: str, date_text: str, link: str) -> tuple[Announcement, Optional[Change]]:
         """Insert or update an announcement, returns the announcement and any change detected"""
         content_hash = self.compute_hash(title, date_text, link)
@@ -150,14 +484,15 @@ class Database:
             existing = self.get_announcement_by_link(link)
             
             if existing:
-                # Update last_seen
+                # Update last_seen; an announcement that shows up again is active
                 cursor.execute(
-                    "UPDATE announcements SET last_seen = ? WHERE id = ?",
+                    "UPDATE announcements SET last_seen = ?, status = 'active', removed_at = NULL WHERE id = ?",
                     (now.isoformat(), existing.id)
                 )
                 
                 # Check if content changed
                 change = None
+                reactivated = 1 if existing.status == "removed" else 0
                 if existing.content_hash != content_hash:
                     cursor.execute(
                         "UPDATE announcements SET title = ?, date_text = ?, content_hash = ? WHERE id = ?",
@@ -181,8 +516,11 @@ class Database:
                         new_content=f"{title}|{date_text}",
                     )
                 
-                conn.commit()
+                self._adjust_counts(cursor, now, reactivated=reactivated, changes=1 if change else 0)
+                self._commit(conn)
                 existing.last_seen = now
+                existing.status = "active"
+                existing.removed_at = None
                 return existing, change
             else:
                 # Insert new announcement
@@ -199,8 +537,10 @@ class Database:
                        VALUES (?, 'new', ?, ?, ?)""",
                     (announcement_id, now.isoformat(), title, f"{title}|{date_text}")
                 )
+                change_id = cursor.lastrowid
                 
-                conn.commit()
+                self._adjust_counts(cursor, now, added=1, changes=1)
+                self._commit(conn)
                 
                 announcement = Announcement(
                     id=announcement_id,
@@ -212,7 +552,7 @@ class Database:
                     last_seen=now,
                 )
                 change = Change(
-                    id=cursor.lastrowid,
+                    id=change_id,
                     announcement_id=announcement_id,
                     change_type="new",
                     detected_at=now,
@@ -224,42 +564,196 @@ class Database:
 
     def mark_removed_announcements(self, current_links: List[str]) -> List[Change]:
         """Mark announcements as removed if they're no longer on the page"""
-        changes = []
+        with self._get_connection() as conn:
+            cursor = conn.cursor()
+            changes = self._mark_removed(cursor, current_links, datetime.now())
+            self._commit(conn)
+        
+        return changes
+
+    def _insert_changes(self, cursor, change_rows: List[tuple], now: datetime) -> List[Change]:
+        """
+        Bulk insert (announcement_id, change_type, title, old_content, new_content)
+        rows detected at `now` and return them as Change objects.
+        """
+        if not change_rows:
+            return []
+        
+        # Runs inside a write transaction, so every id above the current
+        # maximum belongs to this batch
+        cursor.execute("SELECT COALESCE(MAX(id), 0) AS max_id FROM changes")
+        last_change_id = cursor.fetchone()["max_id"]
+        cursor.executemany(
+            """INSERT INTO changes (announcement_id, change_type, detected_at, title, old_content, new_content)
+               VALUES (?, ?, ?, ?, ?, ?)""",
+            [(announcement_id, change_type, now.isoformat(), title, old_content, new_content)
+             for announcement_id, change_type, title, old_content, new_content in change_rows]
+        )
+        cursor.execute("SELECT * FROM changes WHERE id > ? ORDER BY id", (last_change_id,))
+        return [
+            Change(
+                id=row["id"],
+                announcement_id=row["announcement_id"],
+                change_type=row["change_type"],
+                detected_at=now,
+                title=row["title"],
+                old_content=row["old_content"],
+                new_content=row["new_content"],
+            )
+            for row in cursor.fetchall()
+        ]
+
+    @staticmethod
+    def _fill_scan_links(cursor, links: List[str]):
+        # Links go into a per-connection temp table, so checks against them
+        # are joins over tracked announcements rather than huge IN lists
+        cursor.execute("CREATE TEMP TABLE IF NOT EXISTS scan_links (link TEXT PRIMARY KEY)")
+        cursor.execute("DELETE FROM scan_links")
+        cursor.executemany(
+            "INSERT OR IGNORE INTO scan_links (link) VALUES (?)",
+            [(link,) for link in links]
+        )
+
+    def _mark_removed(self, cursor, current_links: List[str], now: datetime) -> List[Change]:
+        self._fill_scan_links(cursor, current_links)
+        
+        # Active announcements that were not part of this scan
+        cursor.execute("""
+            SELECT a.id, a.title, a.date_text FROM announcements a
+            LEFT JOIN scan_links s ON s.link = a.link
+            WHERE a.status = 'active' AND s.link IS NULL
+        """)
+        removed = cursor.fetchall()
+        cursor.execute("DELETE FROM scan_links")
+        
+        cursor.executemany(
+            "UPDATE announcements SET status = 'removed', removed_at = ? WHERE id = ?",
+            [(now.isoformat(), row["id"]) for row in removed]
+        )
+        self._adjust_counts(cursor, now, removed=len(removed), changes=len(removed))
+        return self._insert_changes(
+            cursor,
+            [(row["id"], "removed", row["title"], f"{row['title']}|{row['date_text']}", None) for row in removed],
+            now
+        )
+
+    def apply_scan(self, announcements: List[dict], detect_removals: bool = False,
+                   notify: bool = False) -> List[Change]:
+        """
+        Apply a scan's results in one connection and one transaction.
+
+        Equivalent to calling upsert_announcement for every item (plus
+        mark_removed_announcements when detect_removals is set) and returns
+        the same Change objects. Items flagged "unchanged" by the scraper are
+        not compared, only marked as seen (reactivating them if they had been
+        marked removed) in one bulk update. With `notify`, detected
+        changes are queued in the email outbox within the same transaction.
+        """
         now = datetime.now()
+        now_iso = now.isoformat()
+        
+        # First occurrence of each link wins, as in the scraper
+        scanned = {}
+        for ann in announcements:
+            scanned.setdefault(ann["link"], ann)
+        to_check = [ann for ann in scanned.values() if not ann.get("unchanged")]
         
         with self._get_connection() as conn:
             cursor = conn.cursor()
             
-            # Get all announcements that are not in current_links
-            placeholders = ",".join(["?" for _ in current_links]) if current_links else "''"
-            query = f"""
-                SELECT * FROM announcements 
-                WHERE link NOT IN ({placeholders})
-                AND id NOT IN (
-                    SELECT announcement_id FROM changes 
-                    WHERE change_type = 'removed' AND announcement_id IS NOT NULL
+            # Existing hashes for all scraped links in one query per chunk
+            existing = {}
+            links = [ann["link"] for ann in to_check]
+            for start in range(0, len(links), self.QUERY_CHUNK_SIZE):
+                chunk = links[start:start + self.QUERY_CHUNK_SIZE]
+                placeholders = ",".join(["?" for _ in chunk])
+                cursor.execute(
+                    f"SELECT id, title, date_text, link, content_hash, status FROM announcements WHERE link IN ({placeholders})",
+                    chunk
                 )
-            """
-            cursor.execute(query, current_links if current_links else [])
-            removed = cursor.fetchall()
+                existing.update({row["link"]: row for row in cursor.fetchall()})
+            
+            new_items = []
+            modified = []
+            seen_ids = []
+            reactivated = 0
+            for ann in to_check:
+                content_hash = self.compute_hash(ann["title"], ann["date_text"], ann["link"])
+                row = existing.get(ann["link"])
+                if row is None:
+                    new_items.append((ann, content_hash))
+                    continue
+                seen_ids.append((now_iso, row["id"]))
+                if row["status"] == "removed":
+                    reactivated += 1
+                if row["content_hash"] != content_hash:
+                    modified.append((row, ann, content_hash))
+            
+            # An announcement that shows up again is active
+            cursor.executemany(
+                "UPDATE announcements SET last_seen = ?, status = 'active', removed_at = NULL WHERE id = ?",
+                seen_ids
+            )
+            cursor.executemany(
+                "UPDATE announcements SET title = ?, date_text = ?, content_hash = ? WHERE id = ?",
+                [(ann["title"], ann["date_text"], content_hash, row["id"]) for row, ann, content_hash in modified]
+            )
+            cursor.executemany(
+                """INSERT INTO announcements (title, date_text, link, content_hash, first_seen, last_seen)
+                   VALUES (?, ?, ?, ?, ?, ?)""",
+                [(ann["title"], ann["date_text"], ann["link"], content_hash, now_iso, now_iso)
+                 for ann, content_hash in new_items]
+            )
+            
+            # Ids of the rows just inserted
+            new_ids = {}
+            new_links = [ann["link"] for ann, _ in new_items]
+            for start in range(0, len(new_links), self.QUERY_CHUNK_SIZE):
+                chunk = new_links[start:start + self.QUERY_CHUNK_SIZE]
+                placeholders = ",".join(["?" for _ in chunk])
+                cursor.execute(f"SELECT id, link FROM announcements WHERE link IN ({placeholders})", chunk)
+                new_ids.update({row["link"]: row["id"] for row in cursor.fetchall()})
             
-            for row in removed:
+            # Change rows in scan order
+            modified_rows = {ann["link"]: row for row, ann, _ in modified}
+            change_rows = []
+            for ann in to_check:
+                link = ann["link"]
+                new_content = f"{ann['title']}|{ann['date_text']}"
+                if link in new_ids:
+                    change_rows.append((new_ids[link], "new", ann["title"], None, new_content))
+                elif link in modified_rows:
+                    row = modified_rows[link]
+                    change_rows.append((row["id"], "modified", ann["title"],
+                                        f"{row['title']}|{row['date_text']}", new_content))
+            
+            # Unchanged items skip the comparison but are still seen; a
+            # truncated full crawl may have marked some of them removed
+            unchanged = [link for link, ann in scanned.items() if ann.get("unchanged")]
+            if unchanged:
+                self._fill_scan_links(cursor, unchanged)
+                cursor.execute("""
+                    SELECT COUNT(*) FROM announcements
+                    WHERE status = 'removed' AND link IN (SELECT link FROM scan_links)
+                """)
+                reactivated += cursor.fetchone()[0]
                 cursor.execute(
-                    """INSERT INTO changes (announcement_id, change_type, detected_at, title, old_content)
-                       VALUES (?, 'removed', ?, ?, ?)""",
-                    (row["id"], now.isoformat(), row["title"], f"{row['title']}|{row['date_text']}")
+                    """UPDATE announcements SET last_seen = ?, status = 'active', removed_at = NULL
+                       WHERE link IN (SELECT link FROM scan_links)""",
+                    (now_iso,)
                 )
-                changes.append(Change(
-                    id=cursor.lastrowid,
-                    announcement_id=row["id"],
-                    change_type="removed",
-                    detected_at=now,
-                    title=row["title"],
-                    old_content=f"{row['title']}|{row['date_text']}",
-                    new_content=None,
-                ))
+                cursor.execute("DELETE FROM scan_links")
             
-            conn.commit()
+            changes = self._insert_changes(cursor, change_rows, now)
+            self._adjust_counts(cursor, now, added=len(new_ids), reactivated=reactivated, changes=len(changes))
+            
+            if detect_removals:
+                changes.extend(self._mark_removed(cursor, list(scanned), now))
+            
+            if notify and changes:
+                self._enqueue_notification(cursor, changes, now)
+            
+            self._commit(conn)
         
         return changes
 
@@ -272,18 +766,57 @@ class Database:
                 (limit,)
             )
             rows = cursor.fetchall()
-            return [
-                Change(
-                    id=row["id"],
-                    announcement_id=row["announcement_id"],
-                    change_type=row["change_type"],
-                    detected_at=datetime.fromisoformat(row["detected_at"]) if row["detected_at"] else None,
-                    title=row["title"],
-                    old_content=row["old_content"],
-                    new_content=row["new_content"],
-                )
-                for row in rows
-            ]
+            return [self._row_to_change(row) for row in rows]
+
+    @staticmethod
+    def _row_to_change(row) -> Change:
+        return Change(
+            id=row["id"],
+            announcement_id=row["announcement_id"],
+            change_type=row["change_type"],
+            detected_at=datetime.fromisoformat(row["detected_at"]) if row["detected_at"] else None,
+            title=row["title"],
+            old_content=row["old_content"],
+            new_content=row["new_content"],
+        )
+
+    def get_changes_page(self, since: Optional[str] = None, before_id: Optional[int] = None,
+                         change_type: Optional[str] = None, limit: int = 50) -> Tuple[List[Change], Optional[int]]:
+        """
+        Keyset-paginated change log, most recent first.
+
+        `since` is an ISO timestamp (exclusive) and `before_id` continues after
+        the change with that id. Returns the page and the id to pass as
+        `before_id` for the next page, or None when there are no more rows.
+        """
+        conditions = []
+        params = []
+        if since:
+            conditions.append("detected_at > ?")
+            params.append(since)
+        if before_id is not None:
+            # Rows ordered after the given change in (detected_at, id) order
+            conditions.append("(detected_at, id) < ((SELECT detected_at FROM changes WHERE id = ?), ?)")
+            params.extend([before_id, before_id])
+        if change_type:
+            conditions.append("change_type = ?")
+            params.append(change_type)
+        
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        # One extra row tells whether another page exists
+        params.append(limit + 1)
+        
+        with self._get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                f"SELECT * FROM changes {where} ORDER BY detected_at DESC, id DESC LIMIT ?",
+                params
+            )
+            rows = cursor.fetchall()
+        
+        changes = [self._row_to_change(row) for row in rows[:limit]]
+        next_before_id = changes[-1].id if len(rows) > limit else None
+        return changes, next_before_id
 
     def get_scan_status(self) -> dict:
         """Get the current scan status"""
@@ -291,16 +824,37 @@ class Database:
             cursor = conn.cursor()
             cursor.execute("SELECT * FROM scan_status WHERE id = 1")
             row = cursor.fetchone()
-            cursor.execute("SELECT COUNT(*) as count FROM announcements")
-            count_row = cursor.fetchone()
             
             return {
                 "last_scan": row["last_scan"],
+                "last_full_scan": row["last_full_scan"],
                 "is_scanning": bool(row["is_scanning"]),
-                "announcement_count": count_row["count"],
+                "announcement_count": row["announcement_count"],
+                "active_count": row["active_count"],
+                "removed_count": row["removed_count"],
+                # The stored count belongs to the day of the last change
+                "changes_today": row["changes_today"] if row["changes_day"] == datetime.now().date().isoformat() else 0,
                 "error": row["error"],
             }
 
+    def get_last_full_scan(self) -> Optional[datetime]:
+        """When the last full crawl (with removal detection) completed"""
+        with self._get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT last_full_scan FROM scan_status WHERE id = 1")
+            row = cursor.fetchone()
+            return datetime.fromisoformat(row["last_full_scan"]) if row and row["last_full_scan"] else None
+
+    def mark_full_scan(self):
+        """Record that a full crawl has just completed"""
+        with self._get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "UPDATE scan_status SET last_full_scan = ? WHERE id = 1",
+                (datetime.now().isoformat(),)
+            )
+            self._commit(conn)
+
     def set_scanning(self, is_scanning: bool, error: str = None):
         """Set the scanning status"""
         with self._get_connection() as conn:
@@ -314,17 +868,15 @@ class Database:
                     "UPDATE scan_status SET is_scanning = 0, last_scan = ?, error = ? WHERE id = 1",
                     (datetime.now().isoformat(), error)
                 )
-            conn.commit()
+            self._commit(conn)
 
-    def get_settings(self) -> dict:
-        """Get the current settings"""
+    def _read_settings(self) -> dict:
         with self._get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute("SELECT * FROM settings WHERE id = 1")
             row = cursor.fetchone()
             
             if row:
-                import json
                 recipients = json.loads(row["email_recipients"]) if row["email_recipients"] else []
                 return {
                     "refresh_interval": row["refresh_interval"],
@@ -335,6 +887,9 @@ class Database:
                     "smtp_port": row["smtp_port"],
                     "smtp_username": row["smtp_username"],
                     "smtp_password": row["smtp_password"],
+                    "digest_window_minutes": row["digest_window_minutes"],
+                    "digest_max_changes": row["digest_max_changes"],
+                    "recipient_hourly_limit": row["recipient_hourly_limit"],
                 }
             return {
                 "refresh_interval": 600,
@@ -345,11 +900,54 @@ class Database:
                 "smtp_port": 587,
                 "smtp_username": "",
                 "smtp_password": "",
+                "digest_window_minutes": 0,
+                "digest_max_changes": 50,
+                "recipient_hourly_limit": 0,
             }
 
+    def _sync_external_changes(self):
+        # Called with _settings_lock held. PRAGMA data_version only changes
+        # for commits made by other connections, so this connection is used
+        # for nothing else
+        if self._watch_conn is None:
+            self._watch_conn = self._connect()
+        version = self._watch_conn.execute("PRAGMA data_version").fetchone()[0]
+        if version == self._watch_version:
+            return
+        self._watch_version = version
+        self._settings = None
+        # Every writer bumps the persisted version in its commit
+        persisted = self._watch_conn.execute("SELECT data_version FROM scan_status WHERE id = 1").fetchone()[0]
+        with self._version_lock:
+            self._data_version = max(self._data_version, persisted)
+
+    def _cached_settings(self) -> dict:
+        # Loading under the lock means an invalidation can never be
+        # overwritten by a read that started before it
+        with self._settings_lock:
+            if self.watch_external_changes:
+                self._sync_external_changes()
+            if self._settings is None:
+                self._settings = self._read_settings()
+            return self._settings
+
+    def get_settings(self) -> dict:
+        """Get the current settings (a copy of the cached row)"""
+        settings = self._cached_settings()
+        return dict(settings, email_recipients=list(settings["email_recipients"]))
+
+    def get_refresh_interval(self) -> int:
+        """Seconds between automatic scans"""
+        return int(self._cached_settings()["refresh_interval"])
+
+    def is_email_enabled(self) -> bool:
+        return self._cached_settings()["email_enabled"]
+
+    def get_email_recipients(self) -> List[str]:
+        return list(self._cached_settings()["email_recipients"])
+
     def update_settings(self, settings: dict):
         """Update the settings"""
-        import json
         with self._get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute("""
@@ -361,7 +959,10 @@ class Database:
                     smtp_server = ?,
                     smtp_port = ?,
                     smtp_username = ?,
-                    smtp_password = ?
+                    smtp_password = ?,
+                    digest_window_minutes = ?,
+                    digest_max_changes = ?,
+                    recipient_hourly_limit = ?
                 WHERE id = 1
             """, (
                 settings.get("refresh_interval", 600),
@@ -372,5 +973,307 @@ class Database:
                 settings.get("smtp_port", 587),
                 settings.get("smtp_username", ""),
                 settings.get("smtp_password", ""),
+                max(0, int(settings.get("digest_window_minutes", 0))),
+                max(1, int(settings.get("digest_max_changes", 50))),
+                max(0, int(settings.get("recipient_hourly_limit", 0))),
             ))
-            conn.commit()
+            self._commit(conn)
+        
+        with self._settings_lock:
+            self._settings = None
+
+    @staticmethod
+    def _row_to_scan_job(row) -> ScanJob:
+        return ScanJob(
+            id=row["id"],
+            state=row["state"],
+            trigger=row["trigger"],
+            full=None if row["full_scan"] is None else bool(row["full_scan"]),
+            requested_at=datetime.fromisoformat(row["requested_at"]),
+            started_at=datetime.fromisoformat(row["started_at"]) if row["started_at"] else None,
+            finished_at=datetime.fromisoformat(row["finished_at"]) if row["finished_at"] else None,
+            request_count=row["request_count"],
+            changes_count=row["changes_count"],
+            error=row["error"],
+            timings=json.loads(row["timings"]) if row["timings"] else {},
+        )
+
+    def get_scan_job(self, job_id: int) -> Optional[ScanJob]:
+        """Get a scan job by id"""
+        with self._get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT * FROM scan_jobs WHERE id = ?", (job_id,))
+            row = cursor.fetchone()
+            return self._row_to_scan_job(row) if row else None
+
+    def enqueue_scan_job(self, trigger: str, full: Optional[bool] = None) -> Tuple[ScanJob, bool]:
+        """
+        Queue a scan, coalescing with a job that is already waiting.
+
+        A running job does not absorb new requests, since it may already have
+        crawled past what changed, so at most one job waits behind it.
+        Returns the job and whether it was newly created.
+        """
+        with self._get_connection() as conn:
+            cursor = conn.cursor()
+            # Take the write lock before looking, so concurrent requests
+            # cannot both decide to insert
+            cursor.execute("BEGIN IMMEDIATE")
+            cursor.execute("SELECT * FROM scan_jobs WHERE state = 'queued' ORDER BY id LIMIT 1")
+            row = cursor.fetchone()
+            if row:
+                job_id = row["id"]
+                # A forced full crawl wins over a scheduled-mode request
+                cursor.execute(
+                    """UPDATE scan_jobs SET request_count = request_count + 1,
+                           full_scan = CASE WHEN ? THEN 1 ELSE full_scan END
+                       WHERE id = ?""",
+                    (1 if full else 0, job_id)
+                )
+            else:
+                cursor.execute(
+                    "INSERT INTO scan_jobs (state, trigger, full_scan, requested_at) VALUES ('queued', ?, ?, ?)",
+                    (trigger, None if full is None else int(full), datetime.now().isoformat())
+                )
+                job_id = cursor.lastrowid
+            self._commit(conn)
+            return self.get_scan_job(job_id), row is None
+
+    def claim_next_scan_job(self) -> Optional[ScanJob]:
+        """Move the oldest queued job to running and return it"""
+        with self._get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            cursor.execute("SELECT id FROM scan_jobs WHERE state = 'queued' ORDER BY id LIMIT 1")
+            row = cursor.fetchone()
+            if not row:
+                conn.rollback()
+                return None
+            cursor.execute(
+                "UPDATE scan_jobs SET state = 'running', started_at = ? WHERE id = ?",
+                (datetime.now().isoformat(), row["id"])
+            )
+            self._commit(conn)
+            return self.get_scan_job(row["id"])
+
+    def finish_scan_job(self, job_id: int, changes_count: int, error: Optional[str] = None,
+                        timings: Optional[dict] = None) -> ScanJob:
+        """Record the outcome of a running job"""
+        with self._get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """UPDATE scan_jobs SET state = ?, finished_at = ?, changes_count = ?, error = ?, timings = ?
+                   WHERE id = ?""",
+                ("failed" if error else "succeeded", datetime.now().isoformat(), changes_count, error,
+                 json.dumps(timings or {}), job_id)
+            )
+            self._commit(conn)
+            return self.get_scan_job(job_id)
+
+    def recover_scan_jobs(self) -> int:
+        """
+        Fail jobs left running by a previous process and clear the scanning
+        flag; returns the number of interrupted jobs.
+        """
+        with self._get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """UPDATE scan_jobs SET state = 'failed', finished_at = ?, error = 'Interrupted by restart'
+                   WHERE state = 'running'""",
+                (datetime.now().isoformat(),)
+            )
+            interrupted = cursor.rowcount
+            cursor.execute("UPDATE scan_status SET is_scanning = 0 WHERE id = 1")
+            self._commit(conn)
+            return interrupted
+
+    @staticmethod
+    def _row_to_outbox_message(row) -> OutboxMessage:
+        return OutboxMessage(
+            id=row["id"],
+            state=row["state"],
+            changes=json.loads(row["payload"]),
+            created_at=datetime.fromisoformat(row["created_at"]),
+            attempts=row["attempts"],
+            next_attempt_at=datetime.fromisoformat(row["next_attempt_at"]) if row["next_attempt_at"] else None,
+            sent_at=datetime.fromisoformat(row["sent_at"]) if row["sent_at"] else None,
+            last_error=row["last_error"],
+            recipients=json.loads(row["recipients"]) if row["recipients"] else None,
+        )
+
+    @staticmethod
+    def _enqueue_notification(cursor, changes: List[Change], now: datetime):
+        cursor.execute(
+            "INSERT INTO email_outbox (state, payload, created_at, next_attempt_at) VALUES ('pending', ?, ?, ?)",
+            (json.dumps([c.to_dict() for c in changes]), now.isoformat(), now.isoformat())
+        )
+
+    def get_pending_notifications(self) -> List[OutboxMessage]:
+        """All pending notifications, in the order they should go out"""
+        with self._get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT * FROM email_outbox WHERE state = 'pending' ORDER BY next_attempt_at, id")
+            return [self._row_to_outbox_message(row) for row in cursor.fetchall()]
+
+    def merge_notifications(self, messages: List[OutboxMessage], changes: List[dict]) -> OutboxMessage:
+        """
+        Replace several pending notifications for the same recipients with
+        one digest of `changes`. The originals are kept in the 'merged' state.
+        """
+        now = datetime.now()
+        recipients = messages[0].recipients
+        with self._get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """INSERT INTO email_outbox (state, payload, created_at, next_attempt_at, attempts, recipients)
+                   VALUES ('pending', ?, ?, ?, ?, ?)""",
+                (json.dumps(changes), min(m.created_at for m in messages).isoformat(), now.isoformat(),
+                 max(m.attempts for m in messages), json.dumps(recipients) if recipients is not None else None)
+            )
+            digest_id = cursor.lastrowid
+            cursor.executemany(
+                "UPDATE email_outbox SET state = 'merged', last_error = ? WHERE id = ?",
+                [(f"Merged into notification {digest_id}", m.id) for m in messages]
+            )
+            self._commit(conn)
+            cursor.execute("SELECT * FROM email_outbox WHERE id = ?", (digest_id,))
+            return self._row_to_outbox_message(cursor.fetchone())
+
+    def defer_notification(self, message_id: int, next_attempt_at: datetime, reason: str):
+        """Postpone a notification without counting a failed attempt"""
+        with self._get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "UPDATE email_outbox SET next_attempt_at = ?, last_error = ? WHERE id = ?",
+                (next_attempt_at.isoformat(), reason, message_id)
+            )
+            self._commit(conn)
+
+    def record_notification_sent(self, message: OutboxMessage, recipients: List[str],
+                                 follow_ups: Optional[List[OutboxMessage]] = None):
+        """
+        Mark a notification sent to `recipients` and log the sends.
+
+        Recipients it did not reach (held back by their rate limit, or in a
+        batch that failed) are carried by `follow_ups`: copies of the message
+        with their own recipients, state, attempts and next attempt time.
+        """
+        now = datetime.now().isoformat()
+        with self._get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """UPDATE email_outbox SET state = 'sent', attempts = attempts + 1, sent_at = ?,
+                       last_error = NULL, recipients = ? WHERE id = ?""",
+                (now, json.dumps(recipients), message.id)
+            )
+            cursor.executemany(
+                "INSERT INTO email_sends (outbox_id, recipient, sent_at) VALUES (?, ?, ?)",
+                [(message.id, recipient, now) for recipient in recipients]
+            )
+            for copy in follow_ups or []:
+                cursor.execute(
+                    """INSERT INTO email_outbox
+                           (state, payload, created_at, attempts, next_attempt_at, recipients, last_error)
+                       VALUES (?, ?, ?, ?, ?, ?, ?)""",
+                    (copy.state, json.dumps(copy.changes), copy.created_at.isoformat(), copy.attempts,
+                     copy.next_attempt_at.isoformat() if copy.next_attempt_at else None,
+                     json.dumps(copy.recipients), copy.last_error)
+                )
+            self._commit(conn)
+
+    def record_deliveries(self, deliveries: List[EmailDelivery]):
+        """Log the per-batch outcomes of a send attempt"""
+        if not deliveries:
+            return
+        with self._get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.executemany(
+                """INSERT INTO email_deliveries
+                       (outbox_id, attempt, batch, to_recipients, bcc_recipients, state, error, seconds, finished_at)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                [(d.outbox_id, d.attempt, d.batch, json.dumps(d.to_recipients), json.dumps(d.bcc_recipients),
+                  d.state, d.error, d.seconds, (d.finished_at or datetime.now()).isoformat())
+                 for d in deliveries]
+            )
+            self._commit(conn)
+
+    def get_deliveries(self, message_id: int) -> List[EmailDelivery]:
+        """Batch outcomes of every send attempt of a notification, oldest first"""
+        with self._get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT * FROM email_deliveries WHERE outbox_id = ? ORDER BY id", (message_id,))
+            return [
+                EmailDelivery(
+                    id=row["id"],
+                    outbox_id=row["outbox_id"],
+                    attempt=row["attempt"],
+                    batch=row["batch"],
+                    to_recipients=json.loads(row["to_recipients"]),
+                    bcc_recipients=json.loads(row["bcc_recipients"]),
+                    state=row["state"],
+                    error=row["error"],
+                    seconds=row["seconds"],
+                    finished_at=datetime.fromisoformat(row["finished_at"]),
+                )
+                for row in cursor.fetchall()
+            ]
+
+    def get_recent_sends(self, recipients: List[str], since: datetime) -> Dict[str, List[datetime]]:
+        """Send times per recipient after `since`, oldest first"""
+        sends = {recipient: [] for recipient in recipients}
+        with self._get_connection() as conn:
+            cursor = conn.cursor()
+            for start in range(0, len(recipients), self.QUERY_CHUNK_SIZE):
+                chunk = recipients[start:start + self.QUERY_CHUNK_SIZE]
+                placeholders = ",".join(["?" for _ in chunk])
+                cursor.execute(
+                    f"""SELECT recipient, sent_at FROM email_sends
+                        WHERE recipient IN ({placeholders}) AND sent_at > ? ORDER BY sent_at""",
+                    chunk + [since.isoformat()]
+                )
+                for row in cursor.fetchall():
+                    sends[row["recipient"]].append(datetime.fromisoformat(row["sent_at"]))
+        return sends
+
+    def finish_notification(self, message_id: int, state: str, error: Optional[str] = None,
+                            next_attempt_at: Optional[datetime] = None):
+        """
+        Record a delivery attempt: 'sent', 'skipped' or 'dead' end the message,
+        'pending' schedules a retry at `next_attempt_at`.
+        """
+        now = datetime.now().isoformat()
+        with self._get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """UPDATE email_outbox SET state = ?, attempts = attempts + 1, last_error = ?,
+                       next_attempt_at = ?, sent_at = CASE WHEN ? = 'sent' THEN ? ELSE sent_at END
+                   WHERE id = ?""",
+                (state, error, next_attempt_at.isoformat() if next_attempt_at else None, state, now, message_id)
+            )
+            self._commit(conn)
+
+    def requeue_notification(self, message_id: int) -> bool:
+        """Give a dead-lettered notification a fresh set of attempts"""
+        with self._get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """UPDATE email_outbox SET state = 'pending', attempts = 0, next_attempt_at = ?
+                   WHERE id = ? AND state = 'dead'""",
+                (datetime.now().isoformat(), message_id)
+            )
+            requeued = cursor.rowcount > 0
+            self._commit(conn)
+            return requeued
+
+    def get_outbox_summary(self, dead_limit: int = 20) -> dict:
+        """Message counts per state and the most recent dead letters"""
+        with self._get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT state, COUNT(*) AS count FROM email_outbox GROUP BY state")
+            counts = {row["state"]: row["count"] for row in cursor.fetchall()}
+            cursor.execute(
+                "SELECT * FROM email_outbox WHERE state = 'dead' ORDER BY id DESC LIMIT ?",
+                (dead_limit,)
+            )
+            dead = [self._row_to_outbox_message(row) for row in cursor.fetchall()]
+            return {"counts": counts, "dead": [m.to_dict() for m in dead]}
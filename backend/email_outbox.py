@@ -0,0 +1,257 @@
+"""
+Background sender draining the email outbox
+"""
+import threading
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+from database import Database
+from models import EmailDelivery, OutboxMessage
+
+
+def collapse_flaps(changes: List[dict]) -> List[dict]:
+    """
+    Reduce each announcement's changes in a digest to their net effect.
+
+    An announcement that was added and then modified is reported once as
+    new, one added and removed again is dropped, a chain of edits becomes a
+    single modification (dropped if it ends where it started) and anything
+    ending in a removal is reported as removed.
+    """
+    groups: Dict[int, List[dict]] = {}
+    ordered: List[List[dict]] = []
+    for change in changes:
+        announcement_id = change.get("announcement_id")
+        if announcement_id is None:
+            ordered.append([change])
+            continue
+        if announcement_id not in groups:
+            groups[announcement_id] = []
+            ordered.append(groups[announcement_id])
+        groups[announcement_id].append(change)
+
+    collapsed = []
+    for group in ordered:
+        first, last = group[0], group[-1]
+        if len(group) == 1:
+            collapsed.append(first)
+        elif first.get("change_type") == "new":
+            if last.get("change_type") != "removed":
+                collapsed.append(dict(last, change_type="new", old_content=None))
+        elif last.get("change_type") == "removed":
+            collapsed.append(dict(last, old_content=first.get("old_content") or last.get("old_content")))
+        elif first.get("old_content") != last.get("new_content"):
+            collapsed.append(dict(last, change_type="modified", old_content=first.get("old_content")))
+    return collapsed
+
+
+class OutboxSender:
+    """
+    Delivers queued change notifications on its own thread.
+
+    Scans only write to the outbox, so a slow or unreachable Exchange server
+    never holds up scanning. Notifications for all recipients are held for
+    the digest window from settings (or until it holds enough changes) and
+    then merged into one mail, with flapping announcements collapsed.
+    Recipients over their hourly limit get a deferred copy instead. `send`
+    delivers in recipient batches and reports each batch's outcome, which is
+    logged in email_deliveries; recipients of failed batches get a copy of
+    the message that is retried on its own. Failed sends are retried with
+    exponential backoff (`retry_base` seconds, doubling up to `retry_max`)
+    and moved to the 'dead' state after `max_attempts`. A message is marked
+    sent only after `send` returns, so a crash mid-send means it is sent
+    again rather than lost.
+    """
+
+    def __init__(self, db: Database, send: Callable[[List[dict], dict], List[dict]],
+                 max_attempts: int = 6, retry_base: float = 30.0, retry_max: float = 3600.0,
+                 poll_interval: float = 60.0):
+        self.db = db
+        # send(changes, settings) returns batch outcomes with "to", "bcc",
+        # "batch", "error" and "seconds"; raises when nothing could be sent
+        self.send = send
+        self.max_attempts = max(1, max_attempts)
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.poll_interval = poll_interval
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="email-outbox", daemon=True)
+            self._thread.start()
+
+    def wake(self):
+        """Check for due messages now, e.g. right after a scan queued one"""
+        self._wake.set()
+
+    def retry_delay(self, attempts: int) -> float:
+        """Seconds to wait after the given number of failed attempts"""
+        return min(self.retry_max, self.retry_base * 2 ** (attempts - 1))
+
+    @staticmethod
+    def digest_ready_at(messages: List[OutboxMessage], settings: dict) -> datetime:
+        """When pending notifications for all recipients should be sent as one digest"""
+        oldest = min(message.created_at for message in messages)
+        window = settings.get("digest_window_minutes", 0)
+        if window <= 0 or sum(len(m.changes) for m in messages) >= settings.get("digest_max_changes", 50):
+            return oldest
+        return oldest + timedelta(minutes=window)
+
+    def rate_limit(self, recipients: List[str], settings: dict) -> Tuple[List[str], List[str], Optional[datetime]]:
+        """Split recipients into (allowed, deferred, time the first deferred one frees up)"""
+        limit = settings.get("recipient_hourly_limit", 0)
+        if limit <= 0 or not recipients:
+            return list(recipients), [], None
+        hour_ago = datetime.now() - timedelta(hours=1)
+        sends = self.db.get_recent_sends(list(recipients), hour_ago)
+        allowed = [r for r in recipients if len(sends[r]) < limit]
+        deferred = [r for r in recipients if len(sends[r]) >= limit]
+        # A slot opens when the oldest send still counting against the limit turns an hour old
+        free_at = [sends[r][-limit] + timedelta(hours=1) for r in deferred]
+        return allowed, deferred, min(free_at) if free_at else None
+
+    def deliver(self, message: OutboxMessage, settings: dict):
+        """Attempt one message and record the outcome"""
+        changes = collapse_flaps(message.changes)
+        if not changes:
+            self.db.finish_notification(message.id, "skipped", "All changes cancelled each other out")
+            return
+
+        recipients = message.recipients if message.recipients is not None else settings.get("email_recipients", [])
+        allowed, deferred, deferred_until = self.rate_limit(recipients, settings)
+        if deferred and not allowed:
+            self.db.defer_notification(message.id, deferred_until, "Recipient rate limit reached")
+            return
+
+        attempt = message.attempts + 1
+        try:
+            outcomes = self.send(changes, dict(settings, email_recipients=allowed))
+        except Exception as e:
+            self._fail(message, attempt, str(e))
+            return
+
+        now = datetime.now()
+        self.db.record_deliveries([
+            EmailDelivery(
+                id=None,
+                outbox_id=message.id,
+                attempt=attempt,
+                batch=outcome["batch"],
+                to_recipients=outcome["to"],
+                bcc_recipients=outcome["bcc"],
+                state="sent" if outcome["error"] is None else "failed",
+                error=outcome["error"],
+                seconds=outcome["seconds"],
+                finished_at=now,
+            )
+            for outcome in outcomes
+        ])
+        sent = [r for o in outcomes if o["error"] is None for r in o["to"] + o["bcc"]]
+        failed = [o for o in outcomes if o["error"] is not None]
+        if not sent:
+            self._fail(message, attempt, failed[0]["error"] if failed else "No recipients")
+            return
+
+        follow_ups = []
+        if deferred:
+            print(f"Email notification {message.id} deferred for {len(deferred)} rate-limited recipient(s)")
+            follow_ups.append(OutboxMessage(
+                id=None, state="pending", changes=changes, created_at=message.created_at,
+                next_attempt_at=deferred_until or now, recipients=deferred,
+                last_error="Recipient rate limit reached",
+            ))
+        if failed:
+            # Only the recipients of failed batches are tried again, counting this attempt
+            failed_recipients = [r for o in failed for r in o["to"] + o["bcc"]]
+            state, next_attempt_at = self._next_attempt(attempt)
+            print(f"Email notification {message.id} failed for {len(failed_recipients)} recipient(s) "
+                  f"in {len(failed)} batch(es)" + (", retrying them later" if state == "pending" else ""))
+            follow_ups.append(OutboxMessage(
+                id=None, state=state, changes=changes, created_at=message.created_at, attempts=attempt,
+                next_attempt_at=next_attempt_at, recipients=failed_recipients, last_error=failed[0]["error"],
+            ))
+        self.db.record_notification_sent(message, sent, follow_ups)
+
+    def _next_attempt(self, attempts: int) -> Tuple[str, Optional[datetime]]:
+        """State and retry time of a message after `attempts` failed attempts"""
+        if attempts >= self.max_attempts:
+            return "dead", None
+        return "pending", datetime.now() + timedelta(seconds=self.retry_delay(attempts))
+
+    def _fail(self, message: OutboxMessage, attempts: int, error: str):
+        state, next_attempt_at = self._next_attempt(attempts)
+        if state == "dead":
+            print(f"Email notification {message.id} failed {attempts} times, giving up: {error}")
+        else:
+            delay = (next_attempt_at - datetime.now()).total_seconds()
+            print(f"Email notification {message.id} failed (attempt {attempts}), retrying in {delay:.0f}s: {error}")
+        self.db.finish_notification(message.id, state, error, next_attempt_at=next_attempt_at)
+
+    def process(self) -> float:
+        """Send whatever is due; returns how many seconds to wait before checking again"""
+        settings = self.db.get_settings()
+        pending = self.db.get_pending_notifications()
+        if not settings.get("email_enabled", False):
+            # Turned off after the messages were queued
+            for message in pending:
+                self.db.finish_notification(message.id, "skipped", "Email notifications are disabled")
+            return self.poll_interval
+
+        now = datetime.now()
+        due = [m for m in pending if m.next_attempt_at <= now]
+        waits = [self.poll_interval]
+        waits.extend((m.next_attempt_at - now).total_seconds() for m in pending if m.next_attempt_at > now)
+        sent_any = False
+
+        # Mail for everyone goes out as a digest once its window closes
+        broadcast = [m for m in due if m.recipients is None]
+        if broadcast:
+            ready_at = self.digest_ready_at(broadcast, settings)
+            if ready_at <= now:
+                if len(broadcast) > 1:
+                    changes = collapse_flaps([c for m in broadcast for c in m.changes])
+                    message = self.db.merge_notifications(broadcast, changes)
+                    print(f"Merged {len(broadcast)} notifications into digest {message.id}")
+                else:
+                    message = broadcast[0]
+                self.deliver(message, settings)
+                sent_any = True
+            else:
+                waits.append((ready_at - now).total_seconds())
+
+        # Copies held back for the same recipients (rate limit, failed
+        # batches) are merged once any of them is due, so a limited
+        # recipient gets one catch-up mail rather than one per digest
+        held: Dict[tuple, List[OutboxMessage]] = {}
+        for message in pending:
+            if message.recipients is not None:
+                key = tuple(sorted({r.lower() for r in message.recipients}))
+                held.setdefault(key, []).append(message)
+        for group in held.values():
+            if not any(m.next_attempt_at <= now for m in group):
+                continue
+            if len(group) > 1:
+                group.sort(key=lambda m: (m.created_at, m.id))
+                changes = collapse_flaps([c for m in group for c in m.changes])
+                message = self.db.merge_notifications(group, changes)
+                print(f"Merged {len(group)} held-back notifications into {message.id}")
+            else:
+                message = group[0]
+            self.deliver(message, settings)
+            sent_any = True
+
+        # Deliveries may have queued deferred copies; look again straight away
+        return 0.0 if sent_any else max(0.0, min(waits))
+
+    def _run(self):
+        while True:
+            self._wake.clear()
+            try:
+                timeout = self.process()
+            except Exception as e:
+                print(f"Email outbox error: {e}")
+                timeout = self.poll_interval
+            if timeout > 0:
+                self._wake.wait(timeout)
@@ -3,154 +3,156 @@ Email service for PTT Site Watcher
 Sends email notifications when changes are detected
 Uses exchangelib for Exchange integration
 """
-from exchangelib import Credentials, Account, Message, Mailbox, HTMLBody, Configuration, DELEGATE
+import hashlib
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from email.message import EmailMessage
+from email.policy import SMTP
+from functools import lru_cache
+from exchangelib import Credentials, Account, Message, Mailbox, Configuration, DELEGATE
+from exchangelib.errors import TransportError, UnauthorizedError
 from exchangelib.protocol import BaseProtocol, NoVerifyHTTPAdapter
-from typing import List
+from requests.exceptions import ConnectionError as RequestsConnectionError
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+from markupsafe import Markup
+from typing import Callable, Dict, Iterator, List
 
 # Disable SSL verification (for internal Exchange servers)
 BaseProtocol.HTTP_ADAPTER_CLS = NoVerifyHTTPAdapter
 
+# Accounts are reused between sends so that notifications share one EWS
+# session pool instead of opening a new connection each time. Entries idle
+# longer than this (seconds) are closed and rebuilt on next use. Each entry
+# counts the sends using it, so a retired account is only closed once the
+# last of them is done.
+ACCOUNT_MAX_IDLE = 1800
 
-def format_change_html(change: dict) -> str:
-    """Format a single change as HTML"""
+# Where a batch's recipients are addressed
+RECIPIENT_MODES = ("to", "bcc")
+
+# Failures that may come from a stale session; retried once on a fresh account
+STALE_SESSION_ERRORS = (TransportError, UnauthorizedError, RequestsConnectionError)
+
+_accounts: Dict[tuple, dict] = {}
+_accounts_lock = threading.Lock()
+
+
+# Badge colour and label per change type
+CHANGE_COLORS = {
+    "new": "#22c55e",      # green
+    "modified": "#f59e0b", # amber
+    "removed": "#ef4444",  # red
+}
+CHANGE_LABELS = {
+    "new": "🆕 YENİ",
+    "modified": "✏️ DEĞİŞTİ",
+    "removed": "🗑️ KALDIRILDI",
+}
+
+ANNOUNCEMENTS_URL = "https://www.ptt.gov.tr/duyurular?page=1&announcementType=3"
+
+# Changes listed in one notification; the rest are summarised as "and N more"
+MAX_CHANGE_ROWS = 100
+
+# Templates are compiled once; HTML ones are autoescaped
+_templates = Environment(
+    loader=FileSystemLoader(os.path.join(os.path.dirname(os.path.abspath(__file__)), "templates", "email")),
+    autoescape=select_autoescape(["html"]),
+    trim_blocks=True,
+    lstrip_blocks=True,
+)
+_row_template = _templates.get_template("change_row.html")
+_html_template = _templates.get_template("notification.html")
+_text_template = _templates.get_template("notification.txt")
+
+
+def _change_fields(change: dict) -> dict:
     change_type = change.get("change_type", "unknown")
-    title = change.get("title", "Unknown")
-    detected_at = change.get("detected_at", "")
     link = change.get("new_content", "") or change.get("old_content", "")  # link is stored in content fields
-    
-    colors = {
-        "new": "#22c55e",      # green
-        "modified": "#f59e0b", # amber
-        "removed": "#ef4444",  # red
+    # Only removed announcements lose their link, and only web links are clickable
+    if change_type == "removed" or not str(link).startswith(("http://", "https://")):
+        link = ""
+    return {
+        "change_type": change_type,
+        "label": CHANGE_LABELS.get(change_type, "Bilinmiyor"),
+        "title": change.get("title", "Unknown"),
+        "link": link,
+        "detected_at": str(change.get("detected_at", "") or ""),
     }
-    color = colors.get(change_type, "#6b7280")
-    
-    labels = {
-        "new": "🆕 YENİ",
-        "modified": "✏️ DEĞİŞTİ",
-        "removed": "🗑️ KALDIRILDI",
-    }
-    label = labels.get(change_type, "Bilinmiyor")
-    
-    # Create clickable title if link is available
-    if link and change_type != "removed":
-        title_html = f'<a href="{link}" style="color: #2563eb; text-decoration: none;">{title}</a>'
-    else:
-        title_html = title
-    
-    return f"""
-    <tr>
-        <td style="padding: 12px; border-bottom: 1px solid #e5e7eb;">
-            <span style="display: inline-block; padding: 4px 8px; border-radius: 4px; background-color: {color}; color: white; font-size: 12px; font-weight: bold;">
-                {label}
-            </span>
-        </td>
-        <td style="padding: 12px; border-bottom: 1px solid #e5e7eb;">
-            {title_html}
-        </td>
-        <td style="padding: 12px; border-bottom: 1px solid #e5e7eb; color: #6b7280; font-size: 12px;">
-            {detected_at}
-        </td>
-    </tr>
-    """
 
 
-def create_email_html(changes: List[dict]) -> str:
-    """Create HTML email body with change summary"""
-    changes_html = "".join([format_change_html(c) for c in changes])
-    
-    return f"""
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <meta charset="utf-8">
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    </head>
-    <body style="font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, 'Helvetica Neue', Arial, sans-serif; background-color: #f3f4f6; margin: 0; padding: 20px;">
-        <div style="max-width: 600px; margin: 0 auto; background-color: white; border-radius: 8px; box-shadow: 0 2px 4px rgba(0,0,0,0.1); overflow: hidden;">
-            <!-- Header -->
-            <div style="background: linear-gradient(135deg, #6366f1 0%, #8b5cf6 100%); padding: 24px; text-align: center;">
-                <h1 style="color: white; margin: 0; font-size: 24px;">PTT Site Watcher</h1>
-                <p style="color: rgba(255,255,255,0.8); margin: 8px 0 0 0; font-size: 14px;">
-                    {len(changes)} change(s) detected
-                </p>
-            </div>
-            
-            <!-- Content -->
-            <div style="padding: 24px;">
-                <p style="color: #374151; margin: 0 0 16px 0;">
-                    The following changes were detected on the PTT announcements page:
-                </p>
-                
-                <table style="width: 100%; border-collapse: collapse; margin: 16px 0;">
-                    <thead>
-                        <tr style="background-color: #f9fafb;">
-                            <th style="padding: 12px; text-align: left; font-size: 12px; text-transform: uppercase; color: #6b7280; border-bottom: 2px solid #e5e7eb;">Type</th>
-                            <th style="padding: 12px; text-align: left; font-size: 12px; text-transform: uppercase; color: #6b7280; border-bottom: 2px solid #e5e7eb;">Title</th>
-                            <th style="padding: 12px; text-align: left; font-size: 12px; text-transform: uppercase; color: #6b7280; border-bottom: 2px solid #e5e7eb;">Detected At</th>
-                        </tr>
-                    </thead>
-                    <tbody>
-                        {changes_html}
-                    </tbody>
-                </table>
-                
-                <div style="margin-top: 24px; padding-top: 16px; border-top: 1px solid #e5e7eb;">
-                    <a href="https://www.ptt.gov.tr/duyurular?page=1&announcementType=3" 
-                       style="display: inline-block; padding: 12px 24px; background-color: #6366f1; color: white; text-decoration: none; border-radius: 6px; font-weight: 500;">
-                        View PTT Announcements
-                    </a>
-                </div>
-            </div>
-            
-            <!-- Footer -->
-            <div style="background-color: #f9fafb; padding: 16px 24px; text-align: center;">
-                <p style="color: #9ca3af; margin: 0; font-size: 12px;">
-                    This is an automated notification from PTT Site Watcher.
-                </p>
-            </div>
-        </div>
-    </body>
-    </html>
-    """
+@lru_cache(maxsize=4096)
+def _render_change_row(change_type: str, label: str, title: str, link: str, detected_at: str) -> Markup:
+    # Retries and digests render the same changes again, so rows are cached
+    return Markup(_row_template.render(
+        color=CHANGE_COLORS.get(change_type, "#6b7280"),
+        label=label,
+        title=title,
+        link=link,
+        detected_at=detected_at,
+    ))
 
 
-def send_change_notification(changes: List[dict], settings: dict) -> bool:
-    """
-    Send email notification for detected changes using Exchange
-    
-    Args:
-        changes: List of change dictionaries
-        settings: Settings dictionary with email configuration
-        
-    Returns:
-        True if email was sent successfully
-        
-    Raises:
-        Exception: If email sending fails with details
-    """
-    if not settings.get("email_enabled", False):
-        raise Exception("Email notifications are disabled")
-    
-    recipients = settings.get("email_recipients", [])
-    if not recipients:
-        raise Exception("No email recipients configured")
-    
-    sender = settings.get("email_sender", "")
-    if not sender:
-        raise Exception("No sender email configured")
-    
+def format_change_html(change: dict) -> str:
+    """Format a single change as an HTML table row"""
+    return str(_render_change_row(**_change_fields(change)))
+
+
+def create_email_html(changes: List[dict], max_rows: int = MAX_CHANGE_ROWS) -> str:
+    """Create HTML email body with change summary, listing at most `max_rows` changes"""
+    shown = changes[:max_rows]
+    return _html_template.render(
+        total=len(changes),
+        rows=[_render_change_row(**_change_fields(c)) for c in shown],
+        omitted=len(changes) - len(shown),
+        announcements_url=ANNOUNCEMENTS_URL,
+    )
+
+
+def create_email_text(changes: List[dict], max_rows: int = MAX_CHANGE_ROWS) -> str:
+    """Plain-text alternative of `create_email_html`"""
+    shown = changes[:max_rows]
+    return _text_template.render(
+        total=len(changes),
+        changes=[_change_fields(c) for c in shown],
+        omitted=len(changes) - len(shown),
+        announcements_url=ANNOUNCEMENTS_URL,
+    )
+
+
+def create_email_mime(subject: str, sender: str, changes: List[dict], max_rows: int = MAX_CHANGE_ROWS) -> bytes:
+    """MIME message with the plain-text body and the HTML body as alternatives"""
+    mime = EmailMessage()
+    mime["Subject"] = subject
+    mime["From"] = sender
+    mime.set_content(create_email_text(changes, max_rows))
+    mime.add_alternative(create_email_html(changes, max_rows), subtype="html")
+    return mime.as_bytes(policy=SMTP)
+
+
+def _account_key(settings: dict, max_connections: int) -> tuple:
+    # The password is part of the key, but only as a digest
+    password_digest = hashlib.sha256(settings.get("smtp_password", "").encode()).hexdigest()
+    return (
+        settings.get("smtp_server", "mektup.dgpays.com"),
+        settings.get("smtp_username", ""),
+        settings.get("email_sender", ""),
+        password_digest,
+        max_connections,
+    )
+
+
+def _create_account(settings: dict, max_connections: int) -> Account:
     smtp_username = settings.get("smtp_username", "")
-    smtp_password = settings.get("smtp_password", "")
     exchange_server = settings.get("smtp_server", "mektup.dgpays.com")
     
-    if not smtp_username or not smtp_password:
-        raise Exception("Exchange credentials not configured")
-    
     print(f"Connecting to Exchange server {exchange_server} as {smtp_username}...")
     
     # Create credentials (supports DOMAIN\\username format)
-    credentials = Credentials(smtp_username, smtp_password)
+    credentials = Credentials(smtp_username, settings.get("smtp_password", ""))
     
     # Configure with explicit service endpoint (EWS URL)
     # Exchange servers typically expose EWS at /EWS/Exchange.asmx
@@ -159,32 +161,218 @@ def send_change_notification(changes: List[dict], settings: dict) -> bool:
     
     config = Configuration(
         service_endpoint=service_endpoint,
-        credentials=credentials
+        credentials=credentials,
+        max_connections=max_connections
     )
     
     # Connect to Exchange account
-    account = Account(
-        primary_smtp_address=sender,
+    return Account(
+        primary_smtp_address=settings.get("email_sender", ""),
         config=config,
         autodiscover=False,
         access_type=DELEGATE
     )
+
+
+def _close_account(account: Account):
+    try:
+        account.protocol.close()
+    except Exception as e:
+        print(f"Error closing Exchange session: {e}")
+
+
+def _retire(entry: dict):
+    # Called with _accounts_lock held; the caller closes the account if this returns True
+    entry["retired"] = True
+    return entry["users"] == 0
+
+
+@contextmanager
+def lease_account(settings: dict, max_connections: int = 1) -> Iterator[Account]:
+    """
+    Borrow the cached Exchange account for the configured server, username
+    and sender, with a session pool of `max_connections`.
+    """
+    key = _account_key(settings, max_connections)
+    now = time.monotonic()
+    stale = None
+    with _accounts_lock:
+        entry = _accounts.get(key)
+        if entry is not None and entry["users"] == 0 and now - entry["last_used"] > ACCOUNT_MAX_IDLE:
+            del _accounts[key]
+            _retire(entry)
+            stale, entry = entry, None
+        if entry is None:
+            entry = {"account": _create_account(settings, max_connections), "users": 0, "retired": False}
+            _accounts[key] = entry
+        entry["users"] += 1
+        entry["last_used"] = now
+    if stale is not None:
+        _close_account(stale["account"])
+    try:
+        yield entry["account"]
+    finally:
+        with _accounts_lock:
+            entry["users"] -= 1
+            close = entry["retired"] and entry["users"] == 0
+        if close:
+            _close_account(entry["account"])
+
+
+def discard_account(settings: dict, account: Account, max_connections: int = 1):
+    """
+    Stop reusing `account` if it is still the cached one for these settings.
+    Its session is closed once no send is using it any more.
+    """
+    key = _account_key(settings, max_connections)
+    with _accounts_lock:
+        entry = _accounts.get(key)
+        if entry is None or entry["account"] is not account:
+            # Already replaced by another thread
+            return
+        del _accounts[key]
+        close = _retire(entry)
+    if close:
+        _close_account(account)
+
+
+def invalidate_accounts():
+    """Stop reusing every cached account, e.g. after the email settings changed"""
+    with _accounts_lock:
+        entries = list(_accounts.values())
+        _accounts.clear()
+        idle = [entry for entry in entries if _retire(entry)]
+    for entry in idle:
+        _close_account(entry["account"])
+
+
+def with_account(settings: dict, action: Callable[[Account], None], max_connections: int = 1):
+    """
+    Run `action` with the cached account. A failure that looks like a dead
+    session or expired login is retried once on a newly created account.
+    """
+    account = None
+    try:
+        with lease_account(settings, max_connections) as account:
+            return action(account)
+    except STALE_SESSION_ERRORS as e:
+        print(f"Exchange session failed ({e}), retrying with a new connection...")
+        if account is not None:
+            discard_account(settings, account, max_connections)
+        with lease_account(settings, max_connections) as account:
+            return action(account)
+
+
+def plan_deliveries(recipients: List[str], batch_size: int = 50, mode: str = "to") -> List[dict]:
+    """
+    Split recipients into batches sent as separate messages.
+
+    Addresses are de-duplicated case-insensitively. In "to" mode a batch's
+    recipients are addressed in To:, in "bcc" mode in Bcc: so that they do
+    not see each other. Returns dicts with "to" and "bcc" lists.
+    """
+    if mode not in RECIPIENT_MODES:
+        raise ValueError(f"Unknown recipient mode {mode!r}, expected one of {', '.join(RECIPIENT_MODES)}")
+    seen = set()
+    unique = []
+    for recipient in recipients:
+        address = recipient.strip()
+        if address and address.lower() not in seen:
+            seen.add(address.lower())
+            unique.append(address)
+    batch_size = max(1, batch_size)
+    batches = [unique[start:start + batch_size] for start in range(0, len(unique), batch_size)]
+    if mode == "bcc":
+        return [{"to": [], "bcc": batch} for batch in batches]
+    return [{"to": batch, "bcc": []} for batch in batches]
+
+
+def deliver_change_notification(changes: List[dict], settings: dict, max_rows: int = MAX_CHANGE_ROWS,
+                                batch_size: int = 50, recipient_mode: str = "to",
+                                concurrency: int = 4) -> List[dict]:
+    """
+    Send the notification to every configured recipient in batches.
+
+    The message is rendered once and the batches are sent in parallel, at
+    most `concurrency` at a time, over a cached Exchange account whose
+    session pool holds `concurrency` connections. A
+    failing batch does not affect the others: each batch's outcome is
+    returned as its plan dict plus "batch", "error" (None when sent) and
+    "seconds". Raises only when nothing can be sent at all (notifications
+    disabled, missing configuration).
+    """
+    if not settings.get("email_enabled", False):
+        raise Exception("Email notifications are disabled")
+    
+    batches = plan_deliveries(settings.get("email_recipients", []), batch_size, recipient_mode)
+    if not batches:
+        raise Exception("No email recipients configured")
+    
+    sender = settings.get("email_sender", "")
+    if not sender:
+        raise Exception("No sender email configured")
     
-    # Create message
+    if not settings.get("smtp_username", "") or not settings.get("smtp_password", ""):
+        raise Exception("Exchange credentials not configured")
+    
+    # Create message; EWS takes a single body, so the text and HTML
+    # alternatives are passed as MIME content
     subject = f"PTT Site Watcher: {len(changes)} change(s) detected"
-    html_content = create_email_html(changes)
+    mime_content = create_email_mime(subject, sender, changes, max_rows)
     
-    message = Message(
-        account=account,
-        subject=subject,
-        body=HTMLBody(html_content),
-        to_recipients=[Mailbox(email_address=r) for r in recipients]
-    )
+    def send_batch(index: int, batch: dict) -> dict:
+        def send(account: Account):
+            message = Message(
+                account=account,
+                folder=account.sent,
+                subject=subject,
+                mime_content=mime_content,
+                to_recipients=[Mailbox(email_address=r) for r in batch["to"]] or None,
+                bcc_recipients=[Mailbox(email_address=r) for r in batch["bcc"]] or None
+            )
+            message.send()
+        
+        started = time.perf_counter()
+        error = None
+        try:
+            with_account(settings, send, max_connections=max(1, concurrency))
+        except Exception as e:
+            error = str(e) or type(e).__name__
+            print(f"Email batch {index + 1}/{len(batches)} failed: {error}")
+        return dict(batch, batch=index, error=error, seconds=round(time.perf_counter() - started, 3))
     
-    # Send email
-    print(f"Sending email to {recipients}...")
-    message.send()
+    recipient_count = sum(len(b["to"]) + len(b["bcc"]) for b in batches)
+    print(f"Sending email to {recipient_count} recipient(s) in {len(batches)} batch(es)...")
+    if len(batches) == 1:
+        outcomes = [send_batch(0, batches[0])]
+    else:
+        with ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(batches))),
+                                thread_name_prefix="email-batch") as executor:
+            outcomes = list(executor.map(send_batch, range(len(batches)), batches))
     
-    print(f"Email sent successfully to {len(recipients)} recipient(s)")
-    return True
+    failed = sum(1 for o in outcomes if o["error"] is not None)
+    print(f"Email sent in {len(outcomes) - failed} of {len(outcomes)} batch(es)")
+    return outcomes
+
 
+def send_change_notification(changes: List[dict], settings: dict, **options) -> bool:
+    """
+    Send email notification for detected changes using Exchange
+    
+    Args:
+        changes: List of change dictionaries
+        settings: Settings dictionary with email configuration
+        **options: Batching and rendering options of `deliver_change_notification`
+        
+    Returns:
+        True if email was sent successfully
+        
+    Raises:
+        Exception: If email sending fails with details
+    """
+    outcomes = deliver_change_notification(changes, settings, **options)
+    failed = [o for o in outcomes if o["error"] is not None]
+    if failed:
+        recipients = [r for o in failed for r in o["to"] + o["bcc"]]
+        raise Exception(f"Failed to send to {', '.join(recipients)}: {failed[0]['error']}")
+    return True
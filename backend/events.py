@@ -0,0 +1,112 @@
+"""
+In-process publish/subscribe bus behind the /api/events Server-Sent Events stream
+"""
+import json
+import queue
+import threading
+from collections import deque
+from typing import List, Optional, Tuple
+
+
+class Subscription(queue.Queue):
+    """A client's message queue; remembers a resync message it has not read yet"""
+
+    def __init__(self, maxsize: int):
+        super().__init__(maxsize=maxsize)
+        self.pending_resync: Optional[str] = None
+
+    def get(self, *args, **kwargs):
+        message = super().get(*args, **kwargs)
+        if message is self.pending_resync:
+            self.pending_resync = None
+        return message
+
+
+class EventBus:
+    """
+    Fans events out to every connected SSE client.
+
+    Each event is serialised once into an SSE message and put on every
+    subscriber's queue. A bounded backlog of recent messages lets a client
+    that reconnects with Last-Event-ID catch up on what it missed. When a
+    burst fills a client's queue, the queued messages are replaced by a
+    single "resync" event telling it to reload its data. Only a client that
+    fills its queue again without having read that resync is disconnected as
+    stalled, so it cannot hold memory or slow down publishers.
+    """
+
+    def __init__(self, max_queue: int = 256, backlog_size: int = 256):
+        self.max_queue = max_queue
+        self._subscribers: List[Subscription] = []
+        self._backlog: deque = deque(maxlen=backlog_size)
+        self._last_id = 0
+        self._lock = threading.Lock()
+
+    def subscribe(self, last_event_id: Optional[int] = None) -> Tuple[Subscription, List[str]]:
+        """
+        Register a client; returns its queue and the messages to replay first.
+
+        Replay covers events after `last_event_id`. When those are no longer
+        in the backlog (or came from before a restart) a single "resync"
+        event tells the client to reload its data instead.
+        """
+        subscriber = Subscription(self.max_queue)
+        with self._lock:
+            self._subscribers.append(subscriber)
+            replay = []
+            if last_event_id is not None and last_event_id != self._last_id:
+                oldest = self._backlog[0][0] if self._backlog else self._last_id + 1
+                if last_event_id > self._last_id or last_event_id < oldest - 1:
+                    replay = [self.format_message("resync", {}, self._last_id)]
+                else:
+                    replay = [message for event_id, message in self._backlog if event_id > last_event_id]
+        return subscriber, replay
+
+    def unsubscribe(self, subscriber: Subscription):
+        with self._lock:
+            if subscriber in self._subscribers:
+                self._subscribers.remove(subscriber)
+
+    def publish(self, event: str, data: dict):
+        """Send an event to all subscribers; safe to call from any thread"""
+        with self._lock:
+            self._last_id += 1
+            message = self.format_message(event, data, self._last_id)
+            self._backlog.append((self._last_id, message))
+            for subscriber in list(self._subscribers):
+                try:
+                    subscriber.put_nowait(message)
+                except queue.Full:
+                    if subscriber.pending_resync is not None:
+                        print("Dropping SSE client that stopped reading events")
+                        self._subscribers.remove(subscriber)
+                        self._close(subscriber)
+                    else:
+                        # Fell behind on a burst: skip ahead, the client reloads instead
+                        self._drain(subscriber)
+                        subscriber.pending_resync = self.format_message("resync", {}, self._last_id)
+                        subscriber.put_nowait(subscriber.pending_resync)
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    @staticmethod
+    def _drain(subscriber: Subscription):
+        while True:
+            try:
+                subscriber.get_nowait()
+            except queue.Empty:
+                break
+
+    @classmethod
+    def _close(cls, subscriber: Subscription):
+        # Make room for the end-of-stream marker the stream generator waits for
+        cls._drain(subscriber)
+        subscriber.put_nowait(None)
+
+    @staticmethod
+    def format_message(event: str, data: dict, event_id: Optional[int] = None) -> str:
+        """Serialise an event as an SSE message; without an id it is not replayable"""
+        prefix = f"id: {event_id}\n" if event_id is not None else ""
+        return f"{prefix}event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
@@ -1,7 +1,7 @@
 """
 Data models for PTT Site Watcher
 """
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import datetime
 from typing import Optional
 
@@ -16,6 +16,8 @@ class Announcement:
     content_hash: str
     first_seen: datetime
     last_seen: datetime
+    status: str = "active"  # 'active', 'removed'
+    removed_at: Optional[datetime] = None
 
     def to_dict(self) -> dict:
         return {
@@ -26,6 +28,8 @@ class Announcement:
             "content_hash": self.content_hash,
             "first_seen": self.first_seen.isoformat() if self.first_seen else None,
             "last_seen": self.last_seen.isoformat() if self.last_seen else None,
+            "status": self.status,
+            "removed_at": self.removed_at.isoformat() if self.removed_at else None,
         }
 
 
@@ -59,11 +63,104 @@ class ScanStatus:
     is_scanning: bool
     announcement_count: int
     error: Optional[str]
+    active_count: int = 0
+    removed_count: int = 0
+    changes_today: int = 0
 
     def to_dict(self) -> dict:
         return {
             "last_scan": self.last_scan.isoformat() if self.last_scan else None,
             "is_scanning": self.is_scanning,
             "announcement_count": self.announcement_count,
+            "active_count": self.active_count,
+            "removed_count": self.removed_count,
+            "changes_today": self.changes_today,
             "error": self.error,
         }
+
+
+@dataclass
+class ScanJob:
+    """A queued or executed scan request"""
+    id: Optional[int]
+    state: str  # 'queued', 'running', 'succeeded', 'failed'
+    trigger: str  # 'manual', 'auto'
+    full: Optional[bool]  # None lets the scan pick its mode by schedule
+    requested_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    request_count: int = 1  # Requests coalesced into this job
+    changes_count: Optional[int] = None
+    error: Optional[str] = None
+    timings: dict = field(default_factory=dict)
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "state": self.state,
+            "trigger": self.trigger,
+            "full": self.full,
+            "requested_at": self.requested_at.isoformat() if self.requested_at else None,
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "request_count": self.request_count,
+            "changes_count": self.changes_count,
+            "error": self.error,
+            "timings": self.timings,
+        }
+
+
+@dataclass
+class OutboxMessage:
+    """A change notification waiting in, or delivered from, the email outbox"""
+    id: Optional[int]
+    state: str  # 'pending', 'sent', 'skipped', 'dead', 'merged'
+    changes: list  # Change dicts, as sent in the notification
+    created_at: datetime
+    attempts: int = 0
+    next_attempt_at: Optional[datetime] = None
+    sent_at: Optional[datetime] = None
+    last_error: Optional[str] = None
+    recipients: Optional[list] = None  # None means all configured recipients
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "state": self.state,
+            "changes_count": len(self.changes),
+            "recipients": self.recipients,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "attempts": self.attempts,
+            "next_attempt_at": self.next_attempt_at.isoformat() if self.next_attempt_at else None,
+            "sent_at": self.sent_at.isoformat() if self.sent_at else None,
+            "last_error": self.last_error,
+        }
+
+
+@dataclass
+class EmailDelivery:
+    """One recipient batch of a notification send attempt"""
+    id: Optional[int]
+    outbox_id: int
+    attempt: int
+    batch: int
+    to_recipients: list
+    bcc_recipients: list
+    state: str  # 'sent' or 'failed'
+    error: Optional[str] = None
+    seconds: Optional[float] = None
+    finished_at: Optional[datetime] = None
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "outbox_id": self.outbox_id,
+            "attempt": self.attempt,
+            "batch": self.batch,
+            "to_recipients": self.to_recipients,
+            "bcc_recipients": self.bcc_recipients,
+            "state": self.state,
+            "error": self.error,
+            "seconds": self.seconds,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+        }
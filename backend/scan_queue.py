@@ -0,0 +1,95 @@
+"""
+Persistent scan job queue executed by a single worker thread
+"""
+import threading
+from typing import Callable, Optional, Tuple
+
+from database import Database
+from models import ScanJob
+
+
+class ScanQueue:
+    """
+    Serialises every scan through one worker.
+
+    Jobs live in the scan_jobs table, so requests are coalesced atomically
+    across request threads and survive restarts. The worker is the only
+    thread that runs scans and therefore the only user of the browser pool.
+    `run_job` executes a job and returns (changes_count, error, timings).
+    """
+
+    def __init__(self, db: Database, run_job: Callable[[ScanJob], Tuple[int, Optional[str], dict]],
+                 on_update: Optional[Callable[[ScanJob], None]] = None, poll_interval: float = 5.0):
+        self.db = db
+        self.run_job = run_job
+        # Called with the job whenever it is queued, started or finished
+        self.on_update = on_update
+        # Fallback wake-up, for jobs queued by another process
+        self.poll_interval = poll_interval
+        self._wake = threading.Event()
+        self._finished = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        """Recover from an unclean shutdown and start the worker thread"""
+        if self._thread is not None:
+            return
+        interrupted = self.db.recover_scan_jobs()
+        if interrupted:
+            print(f"Marked {interrupted} interrupted scan job(s) as failed")
+        self._thread = threading.Thread(target=self._run, name="scan-queue", daemon=True)
+        self._thread.start()
+
+    def submit(self, trigger: str = "manual", full: Optional[bool] = None) -> Tuple[ScanJob, bool]:
+        """Queue a scan; returns the job and False when it joined an already queued one"""
+        job, created = self.db.enqueue_scan_job(trigger, full)
+        self._notify(job)
+        self._wake.set()
+        return job, created
+
+    def wait(self, job_id: int, timeout: Optional[float] = None) -> Optional[ScanJob]:
+        """Block until the job has finished (or the timeout passes) and return it"""
+        def finished():
+            job = self.db.get_scan_job(job_id)
+            return job is None or job.state in ("succeeded", "failed")
+
+        with self._finished:
+            self._finished.wait_for(finished, timeout)
+        return self.db.get_scan_job(job_id)
+
+    def _notify(self, job: ScanJob):
+        if self.on_update is None:
+            return
+        try:
+            self.on_update(job)
+        except Exception as e:
+            print(f"Error reporting scan job {job.id}: {e}")
+
+    def _run(self):
+        while True:
+            try:
+                job = self.db.claim_next_scan_job()
+            except Exception as e:
+                print(f"Scan queue error: {e}")
+                job = None
+
+            if job is None:
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+                continue
+
+            print(f"Running scan job {job.id} ({job.trigger}, {job.request_count} request(s))")
+            self._notify(job)
+            try:
+                changes_count, error, timings = self.run_job(job)
+            except Exception as e:
+                changes_count, error, timings = 0, str(e), {}
+
+            try:
+                job = self.db.finish_scan_job(job.id, changes_count, error, timings)
+                print(f"Scan job {job.id} {job.state}")
+                self._notify(job)
+            except Exception as e:
+                print(f"Could not record the outcome of scan job {job.id}: {e}")
+            with self._finished:
+                self._finished.notify_all()
@@ -0,0 +1,135 @@
+"""
+Auto-scan scheduler driven by a monotonic clock
+"""
+import math
+import random
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Optional
+
+
+class ScanScheduler:
+    """
+    Runs `run` (which blocks until its scan is done) every `interval_fn()` seconds.
+
+    In fixed-rate mode runs are due on a fixed grid of interval slots, so
+    scan duration does not shift later runs; in fixed-delay mode each run is
+    due an interval after the previous one finished. A run more than a whole
+    interval overdue (a scan outlasting several slots, a shortened interval)
+    counts as missed: the "run-once" policy runs one catch-up scan right
+    away, "skip" waits for the next slot. Up to `jitter` random seconds are
+    added to each run. Settings changes and enable/disable take effect
+    immediately through `reschedule` and `set_enabled`.
+    """
+
+    MODES = ("fixed-rate", "fixed-delay")
+    MISSED_RUN_POLICIES = ("run-once", "skip")
+
+    def __init__(self, run: Callable[[], None], interval_fn: Callable[[], float],
+                 mode: str = "fixed-rate", jitter: float = 0.0, missed_runs: str = "run-once",
+                 on_schedule: Optional[Callable[[Optional[datetime]], None]] = None):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown auto-scan mode {mode!r}, expected one of {', '.join(self.MODES)}")
+        if missed_runs not in self.MISSED_RUN_POLICIES:
+            raise ValueError(
+                f"Unknown missed-run policy {missed_runs!r}, expected one of {', '.join(self.MISSED_RUN_POLICIES)}"
+            )
+        self.run = run
+        self.interval_fn = interval_fn
+        self.mode = mode
+        self.jitter = max(0.0, jitter)
+        self.missed_runs = missed_runs
+        # Called with the wall-clock time of the next run (None while idle or scanning)
+        self.on_schedule = on_schedule
+
+        self.enabled = True
+        self.next_run: Optional[datetime] = None
+        self._wake = threading.Event()
+        self._stopped = False
+        self._thread: Optional[threading.Thread] = None
+        # Monotonic time the next interval is measured from, and this slot's jitter
+        self._base: Optional[float] = None
+        self._jitter_offset = 0.0
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._base = time.monotonic()
+        self._thread = threading.Thread(target=self._loop, name="scan-scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped = True
+        self._wake.set()
+
+    def set_enabled(self, enabled: bool):
+        """Turn automatic scans on or off; re-enabling starts a fresh interval"""
+        if enabled and not self.enabled:
+            self._base = time.monotonic()
+        self.enabled = enabled
+        self._wake.set()
+
+    def reschedule(self):
+        """Re-read the interval now instead of after the pending wait"""
+        self._wake.set()
+
+    def _set_next_run(self, delay: Optional[float]):
+        self.next_run = None if delay is None else datetime.now(timezone.utc) + timedelta(seconds=delay)
+        if self.on_schedule is not None:
+            try:
+                self.on_schedule(self.next_run)
+            except Exception as e:
+                print(f"Error publishing auto-scan schedule: {e}")
+
+    def _advance(self, interval: float, now: float):
+        """Move the base to the latest slot at or before `now` and draw new jitter"""
+        self._base += math.floor((now - self._base) / interval) * interval
+        self._jitter_offset = random.uniform(0, self.jitter)
+
+    def _loop(self):
+        print(f"Auto-scan scheduler started ({self.mode}, missed runs: {self.missed_runs})")
+        while not self._stopped:
+            self._wake.clear()
+
+            if not self.enabled:
+                self._set_next_run(None)
+                self._wake.wait()
+                continue
+
+            try:
+                interval = max(1.0, float(self.interval_fn()))
+            except Exception as e:
+                print(f"Could not read auto-scan interval: {e}")
+                self._wake.wait(60)
+                continue
+
+            now = time.monotonic()
+            due = self._base + interval
+            if now - due >= interval:
+                # At least one whole slot was missed
+                self._advance(interval, now)
+                if self.missed_runs == "skip":
+                    print("Skipping missed auto-scan runs")
+                    continue
+                print("Running one catch-up auto-scan for missed runs")
+            else:
+                delay = due + self._jitter_offset - now
+                if delay > 0:
+                    self._set_next_run(delay)
+                    print(f"Next auto-scan scheduled for: {self.next_run.isoformat()}")
+                    if self._wake.wait(delay):
+                        # Settings changed, toggled or stopped: recompute
+                        continue
+                    if not self.enabled or self._stopped:
+                        continue
+                self._base = due
+                self._jitter_offset = random.uniform(0, self.jitter)
+
+            self._set_next_run(None)
+            try:
+                self.run()
+            except Exception as e:
+                print(f"Auto-scan error: {e}")
+            if self.mode == "fixed-delay":
+                self._base = time.monotonic()
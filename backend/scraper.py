@@ -1,77 +1,487 @@
 """
-Playwright-based scraper for PTT announcements
+Playwright-based scraper for PTT announcements, with a browserless HTTP fast path
 """
 import asyncio
-from typing import List, Dict
-from playwright.async_api import async_playwright, Page
+import hashlib
+import threading
+import time
+from html.parser import HTMLParser
+from typing import Awaitable, Callable, List, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from playwright.async_api import Page, TimeoutError as PlaywrightTimeoutError
+
+from browser_pool import BrowserPool, BrowserLease, get_browser_pool
+
+
+ANNOUNCEMENT_LINK_SELECTOR = 'a[aria-label^="Daha Fazla Oku"], a[href*="/duyuru/"]'
+
+# Polled inside the page: resolves with the link count once the number of
+# announcement links has held still for settleMs, or with 0 when neither the
+# page load nor any resource request has finished for emptyMs without links
+# being rendered (a negative emptyMs waits for links only). A 0 is only a
+# candidate: the caller confirms it once the network is idle.
+READY_CHECK_JS = """
+([selector, settleMs, emptyMs]) => {
+    const now = performance.now();
+    const count = document.querySelectorAll(selector).length;
+    const state = window.__pttReady || (window.__pttReady = { count: -1, since: now });
+    if (count !== state.count) {
+        state.count = count;
+        state.since = now;
+    }
+    if (count > 0) {
+        return now - state.since >= settleMs ? { links: count } : false;
+    }
+    const nav = performance.getEntriesByType("navigation")[0];
+    const loadedAt = nav && nav.loadEventEnd;
+    if (emptyMs < 0 || !(loadedAt > 0)) {
+        return false;
+    }
+    const quietSince = performance.getEntriesByType("resource")
+        .reduce((latest, entry) => Math.max(latest, entry.responseEnd), loadedAt);
+    return now - quietSince >= emptyMs ? { links: 0 } : false;
+}
+"""
+
+TURKISH_MONTHS = {
+    "Ocak", "Şubat", "Mart", "Nisan", "Mayıs", "Haziran",
+    "Temmuz", "Ağustos", "Eylül", "Ekim", "Kasım", "Aralık",
+}
+
+# Collects every announcement link with the text of its container in one
+# evaluate call. Selector strategies are tried in order: aria-label, href,
+# then link text.
+EXTRACT_LINKS_JS = """
+() => {
+    const strategies = ['a[aria-label^="Daha Fazla Oku"]', 'a[href*="/duyuru/"]'];
+    let links = [];
+    for (const selector of strategies) {
+        links = Array.from(document.querySelectorAll(selector));
+        if (links.length) break;
+    }
+    if (!links.length) {
+        links = Array.from(document.querySelectorAll("a")).filter(
+            (a) => (a.innerText || "").toLowerCase().includes("daha fazla oku")
+        );
+    }
+    return links.map((a) => {
+        const container = a.closest("div") || (a.parentElement && a.parentElement.parentElement);
+        return {
+            href: a.getAttribute("href"),
+            aria_label: a.getAttribute("aria-label"),
+            container_text: container ? container.innerText : "",
+            link_text: a.innerText || "",
+        };
+    });
+}
+"""
+
+
+class HostThrottle:
+    """Politeness budget: minimum spacing between request starts to the same host"""
+
+    def __init__(self, min_interval: float = 1.0):
+        self.min_interval = min_interval
+        self._next_slot: Dict[str, float] = {}
+
+    async def wait(self, url: str):
+        """Sleep until this host's next request slot and reserve it"""
+        if self.min_interval <= 0:
+            return
+        host = urlsplit(url).netloc
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        slot = max(now, self._next_slot.get(host, now))
+        self._next_slot[host] = slot + self.min_interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+class _CrawlState:
+    """
+    Shared page counter for crawl workers, cut short by the first empty page.
+
+    `stop_reason` tells why the crawl ended: "empty" (a page confirmed to
+    have no announcements, i.e. the end of the list), "error" (a page
+    failed or never became ready), "known" (incremental stop at a fully
+    known page) or "max_pages" (the safety limit). Only "empty" means every
+    announcement was seen.
+    """
+
+    def __init__(self, start_page: int, max_pages: int):
+        self.next_page = start_page
+        self.last_page = start_page + max_pages - 1
+        self.stop_reason = "max_pages"
+        self.results: Dict[int, List[Dict]] = {}
+        self.errors: Dict[int, Exception] = {}
+
+    def claim(self) -> Optional[int]:
+        if self.next_page > self.last_page:
+            return None
+        page_num = self.next_page
+        self.next_page += 1
+        return page_num
+
+    def stop_after(self, page_num: int, reason: str):
+        """Stop handing out pages beyond page_num; the earliest cutoff's reason wins"""
+        if page_num < self.last_page or (page_num == self.last_page and self.stop_reason == "max_pages"):
+            self.last_page = page_num
+            self.stop_reason = reason
+
+    def ordered_announcements(self) -> List[Dict]:
+        """Announcements from all kept pages in page order, without duplicate links"""
+        seen_links = set()
+        unique_announcements = []
+        for page_num in sorted(self.results):
+            if page_num > self.last_page:
+                continue
+            for ann in self.results[page_num]:
+                if ann["link"] not in seen_links:
+                    seen_links.add(ann["link"])
+                    unique_announcements.append(ann)
+        return unique_announcements
+
+
+class PageCache:
+    """
+    Per-page HTTP validators and content fingerprints from the last applied scan.
+
+    Pages recorded during a crawl stay pending until commit() is called once
+    the results are safely in the database, so a failed scan can never make a
+    later scan skip pages that were not stored. Pages fetched concurrently
+    past the point where the crawl was cut short are dropped with
+    discard_after(), as their results are not kept either.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._committed: Dict[tuple, Dict] = {}
+        self._pending: Dict[tuple, Dict] = {}
+
+    @staticmethod
+    def fingerprint(announcements: List[Dict]) -> str:
+        """Content hash of a page's extracted announcement list"""
+        content = "\n".join(f"{a['title']}|{a['date_text']}|{a['link']}" for a in announcements)
+        return hashlib.sha1(content.encode()).hexdigest()
+
+    def get(self, key: tuple) -> Optional[Dict]:
+        with self._lock:
+            return self._committed.get(key)
+
+    def record(self, key: tuple, announcements: List[Dict],
+               etag: Optional[str] = None, last_modified: Optional[str] = None) -> bool:
+        """Stage a page's result; returns True if it matches the last applied scan"""
+        fingerprint = self.fingerprint(announcements)
+        with self._lock:
+            self._pending[key] = {
+                "fingerprint": fingerprint,
+                "announcements": announcements,
+                "etag": etag,
+                "last_modified": last_modified,
+            }
+            previous = self._committed.get(key)
+        return previous is not None and previous["fingerprint"] == fingerprint
+
+    def commit(self):
+        """Promote pages staged by the last crawl after their results were applied"""
+        with self._lock:
+            self._committed.update(self._pending)
+            self._pending.clear()
+
+    def discard_after(self, announcement_type: int, last_page: int):
+        """Forget staged pages beyond a crawl's cutoff, whose results were dropped"""
+        with self._lock:
+            for key in [k for k in self._pending if k[0] == announcement_type and k[1] > last_page]:
+                del self._pending[key]
+
+    def discard(self):
+        """Forget pages staged by a crawl whose results were not applied"""
+        with self._lock:
+            self._pending.clear()
+
+
+class HttpFetcher:
+    """
+    Browserless fetcher for list pages that are rendered on the server.
+
+    Uses one pooled keep-alive HTTP session and parses the HTML with the same
+    link strategies as EXTRACT_LINKS_JS, so results have the exact shape
+    produced by PTTScraper._extract_announcements.
+    """
+
+    def __init__(self, base_url: str = "https://www.ptt.gov.tr/duyurular", timeout: float = 15.0,
+                 pool_size: int = 4, session: Optional[requests.Session] = None):
+        self.base_url = base_url
+        self.timeout = timeout
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            session.headers.update({
+                "User-Agent": "Mozilla/5.0 (compatible; PTT-Site-Watcher)",
+                "Accept-Language": "tr-TR,tr;q=0.9",
+            })
+        self.session = session
+
+    def page_url(self, page_num: int, announcement_type: int) -> str:
+        return f"{self.base_url}?page={page_num}&announcementType={announcement_type}"
+
+    def fetch_page(self, page_num: int, announcement_type: int,
+                   cached: Optional[Dict] = None) -> Tuple[List[Dict], Dict]:
+        """
+        GET one list page and parse its announcements (blocking).
+
+        With a cached PageCache entry the request is conditional, and a 304
+        returns the cached announcements without parsing anything. Returns
+        the announcements and the response's validators.
+        """
+        headers = {}
+        if cached:
+            if cached.get("etag"):
+                headers["If-None-Match"] = cached["etag"]
+            if cached.get("last_modified"):
+                headers["If-Modified-Since"] = cached["last_modified"]
+        
+        response = self.session.get(self.page_url(page_num, announcement_type),
+                                    headers=headers, timeout=self.timeout)
+        if response.status_code == 304 and cached:
+            print(f"Page {page_num} not modified")
+            return cached["announcements"], {"etag": cached.get("etag"), "last_modified": cached.get("last_modified")}
+        
+        response.raise_for_status()
+        validators = {
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+        }
+        return parse_link_records(extract_link_records_from_html(response.text)), validators
+
+
+def is_valid_announcement(ann: Dict) -> bool:
+    """True if the item has the shape of a list entry (title, date and detail link)"""
+    return bool(
+        ann.get("title")
+        and ann.get("date_text")
+        and ann.get("link", "").startswith("http")
+        and "/duyuru/" in ann["link"]
+    )
 
 
 class PTTScraper:
     """Scraper for PTT announcement pages using Playwright"""
     
     BASE_URL = "https://www.ptt.gov.tr/duyurular"
+    MAX_PAGES = 20  # Safety limit
     
-    def __init__(self, headless: bool = True):
+    def __init__(self, headless: bool = True, pool: Optional[BrowserPool] = None,
+                 concurrency: int = 1, politeness_delay: float = 1.0,
+                 ready_timeout: float = 15.0, settle_time: float = 0.3, empty_grace: float = 2.0,
+                 http_fetcher: Optional[HttpFetcher] = None, page_cache: Optional[PageCache] = None,
+                 known_page_check: Optional[Callable[[List[Dict]], bool]] = None,
+                 on_progress: Optional[Callable[[Dict], None]] = None):
         self.headless = headless
+        self.pool = pool or get_browser_pool(headless)
+        # Optional browserless fetcher tried before Playwright
+        self.http_fetcher = http_fetcher
+        # Optional cross-scan page state; unchanged pages get their items flagged
+        self.page_cache = page_cache
+        # Incremental mode: returns True when every item on a page is already
+        # stored unchanged, which ends the crawl after that page
+        self.known_page_check = known_page_check
+        # Called with {page, announcements, unchanged, seconds} after each page is scraped
+        self.on_progress = on_progress
+        self.concurrency = max(1, concurrency)
+        self.throttle = HostThrottle(politeness_delay)
+        # Readiness ceilings (seconds): overall cap, how long the link count must
+        # hold still, and how long the page must be quiet without links before
+        # the idle-network check that confirms it is empty
+        self.ready_timeout = ready_timeout
+        self.settle_time = settle_time
+        self.empty_grace = empty_grace
+        # Per-page readiness metrics from the last crawl, keyed by page number
+        self.page_metrics: Dict[int, Dict] = {}
+        # Why the last crawl ended (see _CrawlState)
+        self.stop_reason: Optional[str] = None
 
     async def scrape_all_announcements(self, start_page: int = 1, announcement_type: int = 3) -> List[Dict]:
         """
         Scrape announcements from ALL pages starting from start_page
         """
-        all_announcements = []
-        page_num = start_page
-        max_pages = 20  # Safety limit
-        
-        async with async_playwright() as p:
-            browser = await p.chromium.launch(headless=self.headless)
-            context = await browser.new_context(
-                viewport={"width": 1280, "height": 720},
-                locale="tr-TR"
+        # Pooled browser objects live on the pool's event loop
+        return await self.pool.call(self._scrape_all(start_page, announcement_type))
+
+    def _page_url(self, page_num: int, announcement_type: int) -> str:
+        return f"{self.BASE_URL}?page={page_num}&announcementType={announcement_type}"
+
+    async def _scrape_all(self, start_page: int, announcement_type: int) -> List[Dict]:
+        self.page_metrics = {}
+        self.stop_reason = None
+        
+        # Cheap path first; the browser is only launched when it finds nothing usable
+        if self.http_fetcher is not None:
+            announcements = await self._scrape_with_http(start_page, announcement_type)
+            if announcements:
+                return announcements
+            print("HTTP fast path found no usable announcements, falling back to Playwright")
+            if self.page_cache is not None:
+                self.page_cache.discard()
+        
+        return await self._scrape_with_browser(start_page, announcement_type)
+
+    async def _scrape_with_http(self, start_page: int, announcement_type: int) -> List[Dict]:
+        crawl = _CrawlState(start_page, self.MAX_PAGES)
+        
+        async def fetch(page_num: int) -> List[Dict]:
+            key = (announcement_type, page_num)
+            cached = self.page_cache.get(key) if self.page_cache is not None else None
+            announcements, validators = await asyncio.to_thread(
+                self.http_fetcher.fetch_page, page_num, announcement_type, cached
             )
-            page = await context.new_page()
+            return self._check_unchanged(key, announcements, **validators)
+        
+        workers = [
+            self._crawl_worker(crawl, self.http_fetcher.page_url, announcement_type, fetch)
+            for _ in range(min(self.concurrency, self.MAX_PAGES))
+        ]
+        await asyncio.gather(*workers)
+        self._discard_dropped_pages(crawl, announcement_type)
+        
+        announcements = crawl.ordered_announcements()
+        if crawl.errors or not all(is_valid_announcement(ann) for ann in announcements):
+            return []
+        self.stop_reason = crawl.stop_reason
+        print(f"HTTP fast path found {len(announcements)} announcements")
+        return announcements
+
+    async def _scrape_with_browser(self, start_page: int, announcement_type: int) -> List[Dict]:
+        crawl = _CrawlState(start_page, self.MAX_PAGES)
+        
+        async with self.pool.acquire() as lease:
+            # Each worker drives its own tab in the shared context
+            workers = [
+                self._browser_worker(lease, crawl, announcement_type)
+                for _ in range(min(self.concurrency, self.MAX_PAGES))
+            ]
+            await asyncio.gather(*workers)
+            if crawl.errors:
+                lease.invalidate()
+        self._discard_dropped_pages(crawl, announcement_type)
+        self.stop_reason = crawl.stop_reason
+        
+        return crawl.ordered_announcements()
+
+    def _discard_dropped_pages(self, crawl: _CrawlState, announcement_type: int):
+        # Pages fetched concurrently past the cutoff are not applied, so their
+        # fingerprints must not be committed either
+        if self.page_cache is not None:
+            self.page_cache.discard_after(announcement_type, crawl.last_page)
+
+    async def _browser_worker(self, lease: BrowserLease, crawl: _CrawlState, announcement_type: int):
+        """Crawl pages in a dedicated tab of the borrowed context"""
+        page = await lease.context.new_page()
+        first_page = True
+        
+        async def fetch(page_num: int) -> List[Dict]:
+            nonlocal first_page
+            
+            # Navigate to the page; the list renders client-side after this
+            await page.goto(self._page_url(page_num, announcement_type), wait_until="domcontentloaded", timeout=30000)
+            lease.mark_page_loaded()
+            
+            # Handle cookie consent on each tab's first page
+            if first_page:
+                await self._handle_cookie_consent(page)
+                first_page = False
+            
+            # Wait for content
+            metrics = self.page_metrics[page_num] = await self._wait_for_ready(page)
+            
+            # Extract from current page
+            announcements = await self._extract_announcements(page)
+            if not announcements and not metrics["empty"]:
+                # A list that is merely slow to render must not end the crawl as empty
+                raise RuntimeError(f"Page {page_num} showed no announcements but was not confirmed empty")
+            return self._check_unchanged((announcement_type, page_num), announcements)
+        
+        try:
+            await self._crawl_worker(crawl, self._page_url, announcement_type, fetch)
+        finally:
+            try:
+                await page.close()
+            except Exception:
+                pass
+
+    def _check_unchanged(self, key: tuple, announcements: List[Dict],
+                         etag: Optional[str] = None, last_modified: Optional[str] = None) -> List[Dict]:
+        """Flag a page's items with "unchanged" when the page matches the last applied scan"""
+        if self.page_cache is None or not announcements:
+            return announcements
+        if not self.page_cache.record(key, announcements, etag=etag, last_modified=last_modified):
+            return announcements
+        print(f"Page {key[1]} unchanged since last scan")
+        return [dict(ann, unchanged=True) for ann in announcements]
+
+    async def _crawl_worker(self, crawl: _CrawlState, page_url: Callable[[int, int], str],
+                            announcement_type: int, fetch: Callable[[int], Awaitable[List[Dict]]]):
+        """Fetch pages from the shared counter until the crawl is cut short"""
+        while True:
+            page_num = crawl.claim()
+            if page_num is None:
+                break
             
+            print(f"Scraping page {page_num}...")
             try:
-                while page_num < start_page + max_pages:
-                    print(f"Scraping page {page_num}...")
-                    url = f"{self.BASE_URL}?page={page_num}&announcementType={announcement_type}"
-                    
-                    # Navigate to the page
-                    await page.goto(url, wait_until="networkidle", timeout=30000)
-                    
-                    # Handle cookie consent only on first page
-                    if page_num == start_page:
-                        await self._handle_cookie_consent(page)
-                    
-                    # Wait for content
-                    await page.wait_for_timeout(2000)
-                    
-                    # Extract from current page
-                    page_announcements = await self._extract_announcements(page)
-                    
-                    if not page_announcements:
-                        print(f"No announcements found on page {page_num}. Stopping.")
-                        break
-                        
-                    all_announcements.extend(page_announcements)
-                    page_num += 1
-                    
-                    # Small delay between pages
-                    await page.wait_for_timeout(1000)
-                    
+                await self.throttle.wait(page_url(page_num, announcement_type))
+                started = time.monotonic()
+                page_announcements = await fetch(page_num)
             except Exception as e:
-                print(f"Error during scraping: {e}")
-            finally:
-                await browser.close()
-        
-        # Remove duplicates
-        seen_links = set()
-        unique_announcements = []
-        for ann in all_announcements:
-            if ann["link"] not in seen_links:
-                seen_links.add(ann["link"])
-                unique_announcements.append(ann)
-                
-        return unique_announcements
+                print(f"Error during scraping page {page_num}: {e}")
+                crawl.errors[page_num] = e
+                crawl.stop_after(page_num - 1, "error")
+                break
+            
+            if not page_announcements:
+                print(f"No announcements found on page {page_num}. Stopping.")
+                crawl.stop_after(page_num - 1, "empty")
+                break
+            
+            crawl.results[page_num] = page_announcements
+            self._report_progress(page_num, page_announcements, time.monotonic() - started)
+            
+            # Listing is newest-first, so nothing new can follow a fully known page
+            if await self._page_is_known(page_announcements):
+                print(f"Page {page_num} only has known announcements. Stopping.")
+                crawl.stop_after(page_num, "known")
+                break
+
+    def _report_progress(self, page_num: int, announcements: List[Dict], seconds: float):
+        if self.on_progress is None:
+            return
+        try:
+            self.on_progress({
+                "page": page_num,
+                "announcements": len(announcements),
+                "unchanged": all(ann.get("unchanged") for ann in announcements),
+                "seconds": round(seconds, 3),
+                # Browser readiness metrics (ready_seconds, links, timed_out), if any
+                **self.page_metrics.get(page_num, {}),
+            })
+        except Exception as e:
+            print(f"Error reporting progress for page {page_num}: {e}")
+
+    async def _page_is_known(self, announcements: List[Dict]) -> bool:
+        if self.known_page_check is None:
+            return False
+        if all(ann.get("unchanged") for ann in announcements):
+            return True
+        try:
+            return await asyncio.to_thread(self.known_page_check, announcements)
+        except Exception as e:
+            print(f"Error checking for known announcements: {e}")
+            return False
 
     async def scrape_announcements(self, page_num: int = 1, announcement_type: int = 3) -> List[Dict]:
         """Kept for backward compatibility but effectively unused by scrape_sync now"""
@@ -93,7 +503,8 @@ class PTTScraper:
                     consent_button = page.locator(selector)
                     if await consent_button.count() > 0:
                         await consent_button.first.click()
-                        await page.wait_for_timeout(1000)  # Wait for popup to close
+                        # Wait for popup to close
+                        await consent_button.first.wait_for(state="hidden", timeout=2000)
                         return
                 except Exception:
                     continue
@@ -101,119 +512,264 @@ class PTTScraper:
             # Cookie consent might not be present, continue
             pass
 
-    async def _extract_announcements(self, page: Page) -> List[Dict]:
-        """Extract announcement data from the page"""
-        announcements = []
-        
-        # Try multiple selector strategies
-        link_elements = []
+    async def _wait_for_ready(self, page: Page) -> Dict:
+        """
+        Wait until announcement links are rendered and their count is stable.
+
+        A page that stays quiet without links is only reported empty (end of
+        the list) once the network has gone idle and there are still no
+        links. Returns how long the page took to become ready, its link
+        count and whether it is confirmed empty or timed out.
+        """
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        deadline = started + self.ready_timeout
+        link_count = 0
+        empty = False
+        timed_out = False
         
-        # Strategy 1: aria-label based selector
-        try:
-            link_elements = await page.query_selector_all('a[aria-label^="Daha Fazla Oku"]')
-        except Exception:
-            pass
+        def remaining_ms() -> float:
+            return max(1.0, (deadline - loop.time()) * 1000)
         
-        # Strategy 2: href based selector
-        if not link_elements:
-            try:
-                link_elements = await page.query_selector_all('a[href*="/duyuru/"]')
-            except Exception:
-                pass
+        async def poll_links(empty_ms: float) -> int:
+            handle = await page.wait_for_function(
+                READY_CHECK_JS,
+                arg=[ANNOUNCEMENT_LINK_SELECTOR, self.settle_time * 1000, empty_ms],
+                polling=100,
+                timeout=remaining_ms(),
+            )
+            return (await handle.json_value())["links"]
         
-        # Strategy 3: text based selector
-        if not link_elements:
-            try:
-                link_elements = await page.query_selector_all('a:has-text("Daha Fazla Oku")')
-            except Exception:
-                pass
+        try:
+            link_count = await poll_links(self.empty_grace * 1000)
+            if link_count == 0:
+                await page.wait_for_load_state("networkidle", timeout=remaining_ms())
+                link_count = await page.locator(ANNOUNCEMENT_LINK_SELECTOR).count()
+                if link_count:
+                    # The list arrived late after all; wait for it to settle
+                    link_count = await poll_links(-1)
+                else:
+                    empty = True
+        except PlaywrightTimeoutError:
+            timed_out = True
         
-        print(f"Found {len(link_elements)} announcement links")
+        ready_seconds = round(loop.time() - started, 3)
+        state = ", timed out" if timed_out else ", empty" if empty else ""
+        print(f"Page ready in {ready_seconds}s ({link_count} links{state})")
+        return {"ready_seconds": ready_seconds, "links": link_count, "empty": empty, "timed_out": timed_out}
+
+    async def _extract_announcements(self, page: Page) -> List[Dict]:
+        """Extract announcement data from the page in a single browser round-trip"""
+        try:
+            records = await page.evaluate(EXTRACT_LINKS_JS)
+        except Exception as e:
+            print(f"Error extracting announcements: {e}")
+            return []
         
-        for link_element in link_elements:
-            try:
-                href = await link_element.get_attribute("href")
-                aria_label = await link_element.get_attribute("aria-label")
-                
-                # Skip if this is not a valid announcement link
-                if not href:
-                    continue
-                
-                # Extract title from aria-label if available
-                title = ""
-                if aria_label and aria_label.startswith("Daha Fazla Oku - "):
-                    title = aria_label.replace("Daha Fazla Oku - ", "").strip()
-                
-                # Get date from parent container
-                date_text = ""
-                try:
-                    # Navigate up to find the container with date info
-                    parent = await link_element.evaluate_handle("el => el.closest('div') || el.parentElement.parentElement")
-                    parent_text = await parent.evaluate("el => el.innerText")
-                    
-                    # Parse the text content
-                    lines = [line.strip() for line in parent_text.split('\n') if line.strip()]
-                    
-                    # Look for date pattern (day, month, year)
-                    for i, line in enumerate(lines):
-                        # Check if this looks like a day number
-                        if line.isdigit() and 1 <= int(line) <= 31:
-                            # Next lines should be month and year
-                            if i + 2 < len(lines):
-                                month = lines[i + 1]
-                                year = lines[i + 2] if lines[i + 2].isdigit() else ""
-                                date_text = f"{line} {month} {year}".strip()
-                            break
-                    
-                    # If no title from aria-label, try to extract from parent text
-                    if not title:
-                        for line in lines:
-                            if line and line not in ["İlan Tarihi", "Daha Fazla Oku"] and not line.isdigit():
-                                # Skip Turkish month names
-                                if line not in ["Ocak", "Şubat", "Mart", "Nisan", "Mayıs", "Haziran", 
-                                               "Temmuz", "Ağustos", "Eylül", "Ekim", "Kasım", "Aralık"]:
-                                    title = line
-                                    break
-                                    
-                except Exception as e:
-                    print(f"Error getting parent info: {e}")
-                
-                # Fallback title
-                if not title:
-                    title = await link_element.inner_text()
-                    if title.lower() in ["daha fazla oku", "read more"]:
-                        title = href.split("/")[-1].replace("-", " ").title() if href else "Unknown"
-                
-                # Construct full URL
-                full_link = f"https://www.ptt.gov.tr{href}" if href.startswith("/") else href
-                
-                if title and title.lower() not in ["daha fazla oku", "read more"]:
-                    announcements.append({
-                        "title": title,
-                        "date_text": date_text,
-                        "link": full_link,
-                    })
-                    
-            except Exception as e:
-                print(f"Error extracting announcement: {e}")
-                continue
+        print(f"Found {len(records)} announcement links")
+        announcements = parse_link_records(records)
+        print(f"Extracted {len(announcements)} unique announcements")
+        return announcements
+
+
+def _parse_link_record(record: Dict) -> Optional[Dict]:
+    """Turn one {href, aria_label, container_text, link_text} record into an announcement"""
+    href = record.get("href")
+    aria_label = record.get("aria_label")
+    
+    # Skip if this is not a valid announcement link
+    if not href:
+        return None
+    
+    # Extract title from aria-label if available
+    title = ""
+    if aria_label and aria_label.startswith("Daha Fazla Oku - "):
+        title = aria_label.replace("Daha Fazla Oku - ", "").strip()
+    
+    # Parse the text content of the surrounding container
+    container_text = record.get("container_text") or ""
+    lines = [line.strip() for line in container_text.split('\n') if line.strip()]
+    
+    # Look for date pattern (day, month, year)
+    date_text = ""
+    for i, line in enumerate(lines):
+        # Check if this looks like a day number
+        if line.isdigit() and 1 <= int(line) <= 31:
+            # Next lines should be month and year
+            if i + 2 < len(lines):
+                month = lines[i + 1]
+                year = lines[i + 2] if lines[i + 2].isdigit() else ""
+                date_text = f"{line} {month} {year}".strip()
+            break
+    
+    # If no title from aria-label, try to extract from container text
+    if not title:
+        for line in lines:
+            if line and line not in ["İlan Tarihi", "Daha Fazla Oku"] and not line.isdigit():
+                # Skip Turkish month names
+                if line not in TURKISH_MONTHS:
+                    title = line
+                    break
+    
+    # Fallback title
+    if not title:
+        title = (record.get("link_text") or "").strip()
+        if title.lower() in ["daha fazla oku", "read more"]:
+            title = href.split("/")[-1].replace("-", " ").title()
+    
+    # Construct full URL
+    full_link = f"https://www.ptt.gov.tr{href}" if href.startswith("/") else href
+    
+    if title and title.lower() not in ["daha fazla oku", "read more"]:
+        return {
+            "title": title,
+            "date_text": date_text,
+            "link": full_link,
+        }
+    return None
+
+
+def parse_link_records(records: List[Dict]) -> List[Dict]:
+    """Parse raw link records from a list page into unique announcements"""
+    seen_links = set()
+    unique_announcements = []
+    
+    for record in records:
+        try:
+            ann = _parse_link_record(record)
+        except Exception as e:
+            print(f"Error extracting announcement: {e}")
+            continue
         
         # Remove duplicates based on link
-        seen_links = set()
-        unique_announcements = []
-        for ann in announcements:
-            if ann["link"] not in seen_links:
-                seen_links.add(ann["link"])
-                unique_announcements.append(ann)
-        
-        print(f"Extracted {len(unique_announcements)} unique announcements")
-        return unique_announcements
+        if ann and ann["link"] not in seen_links:
+            seen_links.add(ann["link"])
+            unique_announcements.append(ann)
+    
+    return unique_announcements
+
+
+class _LinkRecordParser(HTMLParser):
+    """Collects <a> elements with the innerText of their closest enclosing <div>"""
+
+    VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input",
+                 "link", "meta", "source", "track", "wbr"}
+    # Without CSS we cannot tell how elements are laid out, so every element
+    # except plain text formatting starts a new line (date parts often sit in
+    # separately styled spans)
+    INLINE_TAGS = {"a", "abbr", "b", "code", "em", "i", "mark", "small", "strong", "sub", "sup", "u"}
+    HIDDEN_TAGS = {"script", "style", "noscript", "template"}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        # Open elements as [tag, text parts]; text is only collected for <div> and <a>
+        self.stack: List[list] = []
+        self.links: List[Dict] = []
+        self._hidden = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag not in self.INLINE_TAGS:
+            self._break_line()
+        if tag in self.VOID_TAGS:
+            return
+        if tag in self.HIDDEN_TAGS:
+            self._hidden += 1
+
+        parts = [] if tag in ("div", "a") else None
+        if tag == "a":
+            attrs = dict(attrs)
+            container = next((node for node in reversed(self.stack) if node[0] == "div"), None)
+            self.links.append({
+                "href": attrs.get("href"),
+                "aria_label": attrs.get("aria-label"),
+                "container": container[1] if container else None,
+                "text": parts,
+            })
+        self.stack.append([tag, parts])
+
+    def handle_endtag(self, tag):
+        # Pop up to the matching element, tolerating unclosed children
+        for i in range(len(self.stack) - 1, -1, -1):
+            if self.stack[i][0] == tag:
+                for node in self.stack[i:]:
+                    if node[0] in self.HIDDEN_TAGS:
+                        self._hidden -= 1
+                del self.stack[i:]
+                break
+        if tag not in self.INLINE_TAGS:
+            self._break_line()
+
+    def handle_data(self, data):
+        if self._hidden:
+            return
+        text = " ".join(data.split())
+        if not text:
+            return
+        for _, parts in self.stack:
+            if parts is not None:
+                parts.append(text)
+
+    def _break_line(self):
+        for _, parts in self.stack:
+            if parts is not None and parts and parts[-1] != "\n":
+                parts.append("\n")
+
+
+def _join_text(parts: Optional[List[str]]) -> str:
+    if not parts:
+        return ""
+    text = " ".join(parts)
+    return "\n".join(" ".join(line.split()) for line in text.split("\n"))
+
+
+def extract_link_records_from_html(html: str) -> List[Dict]:
+    """HTML equivalent of EXTRACT_LINKS_JS for server-rendered pages"""
+    parser = _LinkRecordParser()
+    parser.feed(html)
+    parser.close()
+
+    links = parser.links
+    strategies = [
+        lambda link: (link["aria_label"] or "").startswith("Daha Fazla Oku"),
+        lambda link: "/duyuru/" in (link["href"] or ""),
+        lambda link: "daha fazla oku" in _join_text(link["text"]).lower(),
+    ]
+    matched = []
+    for matches in strategies:
+        matched = [link for link in links if matches(link)]
+        if matched:
+            break
+
+    return [
+        {
+            "href": link["href"],
+            "aria_label": link["aria_label"],
+            "container_text": _join_text(link["container"]),
+            "link_text": _join_text(link["text"]),
+        }
+        for link in matched
+    ]
+
+
+def scrape_crawl(page_num: int = 1, announcement_type: int = 3, headless: bool = True,
+                 **options) -> Tuple[List[Dict], Optional[str]]:
+    """
+    Scrape ALL pages synchronously; returns the announcements and why the
+    crawl ended ("empty", "error", "known" or "max_pages", None when no
+    crawl produced results). Extra keyword options are passed to PTTScraper.
+    """
+    scraper = PTTScraper(headless=headless, **options)
+    announcements = scraper.pool.run(scraper._scrape_all(start_page=page_num, announcement_type=announcement_type))
+    return announcements, scraper.stop_reason
 
 
-def scrape_sync(page_num: int = 1, announcement_type: int = 3, headless: bool = True) -> List[Dict]:
-    """Synchronous wrapper for the scraper that now scrapes ALL pages"""
-    scraper = PTTScraper(headless=headless)
-    return asyncio.run(scraper.scrape_all_announcements(start_page=page_num, announcement_type=announcement_type))
+def scrape_sync(page_num: int = 1, announcement_type: int = 3, headless: bool = True,
+                **options) -> List[Dict]:
+    """
+    Synchronous wrapper for the scraper that now scrapes ALL pages.
+    Extra keyword options are passed to PTTScraper.
+    """
+    return scrape_crawl(page_num, announcement_type, headless, **options)[0]
 
 
 if __name__ == "__main__":
@@ -50,7 +50,7 @@ def simulate_new_announcement(db: Database):
                VALUES (?, 'new', ?, ?, ?)""",
             (announcement_id, now.isoformat(), title, f"{title}|{date_text}")
         )
-        conn.commit()
+        db._commit(conn)
     
     print(f"Inserted new announcement: {title}")
     print("Check the frontend for a 'New' notification.")
@@ -93,7 +93,7 @@ def simulate_modified_announcement(db: Database):
             (ann_id, now.isoformat(), new_title, 
              f"{old_title}|{old_date}", f"{new_title}|{new_date}")
         )
-        conn.commit()
+        db._commit(conn)
         
     print(f"Modified announcement ID {ann_id}")
     print(f"Old: {old_title}")
@@ -119,21 +119,24 @@ def simulate_removed_announcement(db: Database):
             (temp_title, "today", temp_link, temp_hash, datetime.now().isoformat(), datetime.now().isoformat())
         )
         ann_id = cursor.lastrowid
-        conn.commit()
+        db._commit(conn)
         
         print(f"Created temporary announcement: {temp_title}")
         
-        # Now "remove" it by adding a removed change record
-        # Note: In the real app, the announcement stays in DB but isn't in the scan results.
-        # But for 'removed' notifications, we look at the changes table.
+        # Now "remove" it the way a full scan does: the announcement stays in
+        # the DB with status 'removed' and a removed change record is added
         
         now = datetime.now()
+        cursor.execute(
+            "UPDATE announcements SET status = 'removed', removed_at = ? WHERE id = ?",
+            (now.isoformat(), ann_id)
+        )
         cursor.execute(
             """INSERT INTO changes (announcement_id, change_type, detected_at, title, old_content)
                VALUES (?, 'removed', ?, ?, ?)""",
             (ann_id, now.isoformat(), temp_title, f"{temp_title}|today")
         )
-        conn.commit()
+        db._commit(conn)
         
     print(f"Removed announcement: {temp_title}")
     print("Check the frontend for a 'Removed' notification.")
@@ -161,6 +164,10 @@ def main():
             break
         else:
             print("Invalid choice")
+            continue
+        
+        # The simulations write the tables directly, bypassing the counters
+        db.refresh_counts()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,104 @@
+"""
+Regression check for the scraper's page cache, run offline against canned pages.
+
+An incremental scan with concurrent workers fetches pages past the point
+where it stops; their fingerprints must not be committed, or a later full
+scan treats those pages as unchanged and never applies their edits.
+"""
+import os
+import sys
+import tempfile
+
+# Add current directory to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from database import Database
+from scraper import HttpFetcher, PageCache, scrape_crawl, scrape_sync
+
+
+class CannedFetcher(HttpFetcher):
+    """Serves list pages from memory instead of the network"""
+
+    def __init__(self, pages):
+        super().__init__()
+        self.pages = pages
+
+    def fetch_page(self, page_num, announcement_type, cached=None):
+        return [dict(ann) for ann in self.pages.get(page_num, [])], {"etag": None, "last_modified": None}
+
+
+def make_pages(page_count: int = 4, per_page: int = 3):
+    return {
+        page: [
+            {
+                "title": f"Duyuru {page}-{i}",
+                "date_text": "1 Ocak 2026",
+                "link": f"https://www.ptt.gov.tr/duyuru/{page}-{i}",
+            }
+            for i in range(per_page)
+        ]
+        for page in range(1, page_count + 1)
+    }
+
+
+def scan(db: Database, fetcher: CannedFetcher, cache: PageCache, incremental: bool):
+    announcements = scrape_sync(
+        http_fetcher=fetcher,
+        page_cache=cache,
+        concurrency=4,
+        politeness_delay=0,
+        known_page_check=db.all_known if incremental else None,
+    )
+    changes = db.apply_scan(announcements, detect_removals=not incremental)
+    cache.commit()
+    return changes
+
+
+def check_edit_on_page_past_incremental_stop():
+    """An edit on page 3 must be found by the full scan after an incremental one"""
+    print("\n=== Edit on a page past the incremental stop ===")
+    db = Database(os.path.join(tempfile.mkdtemp(), "page_cache_check.db"))
+    pages = make_pages()
+    fetcher = CannedFetcher(pages)
+    cache = PageCache()
+
+    scan(db, fetcher, cache, incremental=False)
+    pages[3][1]["title"] = "Duyuru 3-1 (güncellendi)"
+
+    # Page 1 is fully known, so this stops after it while pages 2-4 are in flight
+    changes = scan(db, fetcher, cache, incremental=True)
+    assert changes == [], f"incremental scan should not reach page 3, got {changes}"
+
+    changes = scan(db, fetcher, cache, incremental=False)
+    assert [(c.change_type, c.title) for c in changes] == [("modified", "Duyuru 3-1 (güncellendi)")], \
+        f"full scan missed the edit on page 3: {changes}"
+    print("OK: full scan reported the edit")
+
+
+def check_stop_reasons():
+    """Only a crawl that reached an empty page may be used to detect removals"""
+    print("\n=== Crawl stop reasons ===")
+    db = Database(os.path.join(tempfile.mkdtemp(), "page_cache_check.db"))
+    fetcher = CannedFetcher(make_pages())
+    options = {"http_fetcher": fetcher, "concurrency": 4, "politeness_delay": 0}
+
+    announcements, reason = scrape_crawl(**options)
+    assert len(announcements) == 12 and reason == "empty", f"full crawl ended on {reason}"
+    db.apply_scan(announcements, detect_removals=True)
+
+    announcements, reason = scrape_crawl(known_page_check=db.all_known, **options)
+    assert reason == "known", f"incremental crawl ended on {reason}"
+
+    fetcher.pages = make_pages(page_count=25, per_page=1)
+    announcements, reason = scrape_crawl(**options)
+    assert len(announcements) == 20 and reason == "max_pages", f"capped crawl ended on {reason}"
+    print("OK: empty, known and max_pages stops are told apart")
+
+
+def main():
+    check_edit_on_page_past_incremental_stop()
+    check_stop_reasons()
+
+
+if __name__ == "__main__":
+    main()
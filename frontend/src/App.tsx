@@ -5,10 +5,31 @@ import { AnnouncementList } from './components/AnnouncementList';
 import { ChangeLog } from './components/ChangeLog';
 import { ChangeAlert } from './components/ChangeAlert';
 import { SettingsPage } from './components/SettingsPage';
-import { fetchStatus, fetchAnnouncements, fetchChanges, triggerScan } from './services/api';
+import { fetchStatus, fetchAnnouncements, fetchChanges, triggerScan, subscribeToEvents } from './services/api';
 import type { ScanStatus, Announcement, Change } from './types';
 import './App.css';
 
+const playNotificationSound = () => {
+  // Create a simple beep sound
+  try {
+    const audioContext = new (window.AudioContext || (window as unknown as { webkitAudioContext: typeof AudioContext }).webkitAudioContext)();
+    const oscillator = audioContext.createOscillator();
+    const gainNode = audioContext.createGain();
+
+    oscillator.connect(gainNode);
+    gainNode.connect(audioContext.destination);
+
+    oscillator.frequency.value = 800;
+    oscillator.type = 'sine';
+    gainNode.gain.value = 0.3;
+
+    oscillator.start();
+    oscillator.stop(audioContext.currentTime + 0.2);
+  } catch (e) {
+    console.log('Could not play notification sound:', e);
+  }
+};
+
 function App() {
   const [status, setStatus] = useState<ScanStatus | null>(null);
   const [announcements, setAnnouncements] = useState<Announcement[]>([]);
@@ -16,11 +37,15 @@ function App() {
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState<string | null>(null);
   const [newChanges, setNewChanges] = useState<Change[]>([]);
+  const [newChangesTotal, setNewChangesTotal] = useState(0);
   const [showAlert, setShowAlert] = useState(false);
   const [countdown, setCountdown] = useState<string>('');
   const [showSettings, setShowSettings] = useState(false);
+  const [scanPage, setScanPage] = useState<number | null>(null);
 
-  const lastChangeCount = useRef(0);
+  // Changes streamed during the current scan, shown together when it completes
+  const pendingChanges = useRef<Change[]>([]);
+  const pendingTotal = useRef(0);
 
   const loadData = useCallback(async () => {
     try {
@@ -31,19 +56,6 @@ function App() {
       ]);
       setStatus(statusData);
       setAnnouncements(announcementsData);
-
-      // Check for new changes
-      if (changesData.length > lastChangeCount.current && lastChangeCount.current > 0) {
-        const newOnes = changesData.slice(0, changesData.length - lastChangeCount.current);
-        if (newOnes.length > 0) {
-          setNewChanges(newOnes);
-          setShowAlert(true);
-          // Play notification sound
-          playNotificationSound();
-        }
-      }
-      lastChangeCount.current = changesData.length;
-
       setChanges(changesData);
       setError(null);
     } catch (err) {
@@ -54,27 +66,6 @@ function App() {
     }
   }, []);
 
-  const playNotificationSound = () => {
-    // Create a simple beep sound
-    try {
-      const audioContext = new (window.AudioContext || (window as unknown as { webkitAudioContext: typeof AudioContext }).webkitAudioContext)();
-      const oscillator = audioContext.createOscillator();
-      const gainNode = audioContext.createGain();
-
-      oscillator.connect(gainNode);
-      gainNode.connect(audioContext.destination);
-
-      oscillator.frequency.value = 800;
-      oscillator.type = 'sine';
-      gainNode.gain.value = 0.3;
-
-      oscillator.start();
-      oscillator.stop(audioContext.currentTime + 0.2);
-    } catch (e) {
-      console.log('Could not play notification sound:', e);
-    }
-  };
-
   // Server handles auto-scanning, we just update the countdown display from server status
 
   // Update countdown every second based on server's next_auto_scan
@@ -91,7 +82,7 @@ function App() {
           setCountdown('Scanning...');
         }
       } else if (status?.is_scanning) {
-        setCountdown('Scanning...');
+        setCountdown(scanPage ? `Scanning page ${scanPage}...` : 'Scanning...');
       } else {
         // No next scan time from server yet, show loading
         setCountdown('--:--');
@@ -102,37 +93,50 @@ function App() {
     const interval = setInterval(updateCountdown, 1000);
 
     return () => clearInterval(interval);
-  }, [status?.next_auto_scan, status?.is_scanning]);
+  }, [status?.next_auto_scan, status?.is_scanning, scanPage]);
 
   useEffect(() => {
     loadData();
 
-    // Poll for status updates every 5 seconds to stay in sync with server
-    const interval = setInterval(() => {
-      loadData();
-    }, 5000);
+    // The server pushes status, scan progress and changes over one held
+    // connection; lists are only refetched when a scan completes
+    const unsubscribe = subscribeToEvents({
+      // Also fires on reconnect, catching up on anything missed meanwhile
+      onOpen: loadData,
+      onStatus: setStatus,
+      onScanStarted: () => {
+        pendingChanges.current = [];
+        setScanPage(null);
+      },
+      onScanProgress: (progress) => setScanPage(progress.page),
+      onChanges: (event) => {
+        pendingChanges.current = event.changes;
+        pendingTotal.current = event.total;
+      },
+      onScanCompleted: () => {
+        setScanPage(null);
+        if (pendingChanges.current.length > 0) {
+          setNewChanges(pendingChanges.current);
+          setNewChangesTotal(pendingTotal.current);
+          setShowAlert(true);
+          // Play notification sound
+          playNotificationSound();
+        }
+        pendingChanges.current = [];
+        loadData();
+      },
+      onResync: loadData,
+    });
 
-    return () => {
-      clearInterval(interval);
-    };
+    return unsubscribe;
   }, [loadData]);
 
   const handleScan = async () => {
     try {
       await triggerScan();
-      // Immediately reload status to show scanning state
+      // Progress and completion arrive over the event stream
       const statusData = await fetchStatus();
       setStatus(statusData);
-
-      // Poll until scanning is complete
-      const pollInterval = setInterval(async () => {
-        const newStatus = await fetchStatus();
-        setStatus(newStatus);
-        if (!newStatus.is_scanning) {
-          clearInterval(pollInterval);
-          await loadData();
-        }
-      }, 2000);
     } catch (err) {
       setError(err instanceof Error ? err.message : 'Failed to start scan');
     }
@@ -159,7 +163,7 @@ function App() {
     <div className="min-h-screen bg-gradient-to-br from-dark-950 via-dark-900 to-dark-950">
       {/* Change Alert */}
       {showAlert && newChanges.length > 0 && (
-        <ChangeAlert changes={newChanges} onDismiss={dismissAlert} />
+        <ChangeAlert changes={newChanges} total={newChangesTotal} onDismiss={dismissAlert} />
       )}
 
       {/* Header */}
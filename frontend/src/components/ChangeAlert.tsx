@@ -2,6 +2,8 @@ import type { Change } from '../types';
 
 interface ChangeAlertProps {
     changes: Change[];
+    // All changes of the scan; only the first ones are listed
+    total?: number;
     onDismiss: () => void;
 }
 
@@ -26,7 +28,7 @@ const changeTypeConfig = {
     },
 };
 
-export function ChangeAlert({ changes, onDismiss }: ChangeAlertProps) {
+export function ChangeAlert({ changes, total = changes.length, onDismiss }: ChangeAlertProps) {
     return (
         <div className="fixed inset-0 z-[100] flex items-center justify-center p-4 bg-black/50 backdrop-blur-sm animate-fadeIn">
             <div className="bg-dark-900 rounded-2xl border border-dark-700 shadow-2xl max-w-lg w-full max-h-[80vh] overflow-hidden animate-slideUp">
@@ -47,7 +49,7 @@ export function ChangeAlert({ changes, onDismiss }: ChangeAlertProps) {
                             <div>
                                 <h2 className="text-xl font-bold text-white">Changes Detected!</h2>
                                 <p className="text-white/80 text-sm">
-                                    {changes.length} change{changes.length > 1 ? 's' : ''} found
+                                    {total} change{total > 1 ? 's' : ''} found
                                 </p>
                             </div>
                         </div>
@@ -104,6 +106,11 @@ export function ChangeAlert({ changes, onDismiss }: ChangeAlertProps) {
                                 </div>
                             );
                         })}
+                        {total > changes.length && (
+                            <p className="text-center text-sm text-dark-500">
+                                ... and {total - changes.length} more in the change log
+                            </p>
+                        )}
                     </div>
                 </div>
 
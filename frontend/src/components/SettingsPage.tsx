@@ -317,6 +317,51 @@ export function SettingsPage({ onClose }: SettingsPageProps) {
                                     )}
                                 </div>
                             </div>
+
+                            {/* Batching and Rate Limits */}
+                            <div className="grid grid-cols-1 md:grid-cols-3 gap-4">
+                                <div>
+                                    <label className="block text-dark-300 text-sm mb-2">Digest Window (minutes)</label>
+                                    <input
+                                        type="number"
+                                        min="0"
+                                        value={settings.digest_window_minutes}
+                                        onChange={(e) =>
+                                            setSettings({ ...settings, digest_window_minutes: parseInt(e.target.value) || 0 })
+                                        }
+                                        className="w-full px-4 py-2.5 bg-dark-800/50 border border-dark-700/50 rounded-xl text-white placeholder-dark-500 focus:outline-none focus:ring-2 focus:ring-primary-500/50 focus:border-primary-500/50"
+                                    />
+                                    <p className="text-dark-500 text-xs mt-1">0 sends after every scan</p>
+                                </div>
+
+                                <div>
+                                    <label className="block text-dark-300 text-sm mb-2">Send Digest At (changes)</label>
+                                    <input
+                                        type="number"
+                                        min="1"
+                                        value={settings.digest_max_changes}
+                                        onChange={(e) =>
+                                            setSettings({ ...settings, digest_max_changes: parseInt(e.target.value) || 1 })
+                                        }
+                                        className="w-full px-4 py-2.5 bg-dark-800/50 border border-dark-700/50 rounded-xl text-white placeholder-dark-500 focus:outline-none focus:ring-2 focus:ring-primary-500/50 focus:border-primary-500/50"
+                                    />
+                                    <p className="text-dark-500 text-xs mt-1">Sends before the window ends</p>
+                                </div>
+
+                                <div>
+                                    <label className="block text-dark-300 text-sm mb-2">Emails per Recipient / Hour</label>
+                                    <input
+                                        type="number"
+                                        min="0"
+                                        value={settings.recipient_hourly_limit}
+                                        onChange={(e) =>
+                                            setSettings({ ...settings, recipient_hourly_limit: parseInt(e.target.value) || 0 })
+                                        }
+                                        className="w-full px-4 py-2.5 bg-dark-800/50 border border-dark-700/50 rounded-xl text-white placeholder-dark-500 focus:outline-none focus:ring-2 focus:ring-primary-500/50 focus:border-primary-500/50"
+                                    />
+                                    <p className="text-dark-500 text-xs mt-1">0 is unlimited</p>
+                                </div>
+                            </div>
                         </div>
                     </section>
 
@@ -62,6 +62,15 @@ export function StatusIndicator({ status, loading }: StatusIndicatorProps) {
                     <p className="text-xl font-semibold">
                         {status.announcement_count} <span className="text-dark-400 text-sm font-normal">announcements</span>
                     </p>
+                    {status.removed_count > 0 && (
+                        <p className="text-dark-500 text-xs">{status.removed_count} removed</p>
+                    )}
+                </div>
+                <div className="text-right">
+                    <p className="text-dark-400 text-sm mb-1">Today</p>
+                    <p className="text-xl font-semibold">
+                        {status.changes_today} <span className="text-dark-400 text-sm font-normal">changes</span>
+                    </p>
                 </div>
             </div>
             {status.error && (
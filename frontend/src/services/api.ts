@@ -1,4 +1,13 @@
-import type { Announcement, Change, ScanStatus } from '../types';
+import type {
+    Announcement,
+    Change,
+    ScanStatus,
+    ScanJob,
+    ScanStartedEvent,
+    ScanProgressEvent,
+    ChangesEvent,
+    ScanCompletedEvent,
+} from '../types';
 
 const API_BASE = import.meta.env.VITE_API_URL || 'http://localhost:5000/api';
 
@@ -20,7 +29,7 @@ export async function fetchChanges(limit = 50): Promise<Change[]> {
     return response.json();
 }
 
-export async function triggerScan(): Promise<{ message: string }> {
+export async function triggerScan(): Promise<{ message: string; job: ScanJob }> {
     const response = await fetch(`${API_BASE}/scan`, {
         method: 'POST',
     });
@@ -48,3 +57,34 @@ export async function updateSettings(settings: Partial<import('../types').Settin
     if (!response.ok) throw new Error('Failed to update settings');
     return response.json();
 }
+
+export interface EventHandlers {
+    onOpen?: () => void;
+    onStatus?: (status: ScanStatus) => void;
+    onScanStarted?: (event: ScanStartedEvent) => void;
+    onScanProgress?: (event: ScanProgressEvent) => void;
+    onChanges?: (event: ChangesEvent) => void;
+    onScanCompleted?: (event: ScanCompletedEvent) => void;
+    onResync?: () => void;
+}
+
+// Subscribe to the server's event stream; returns a function that closes it.
+// EventSource reconnects on its own and resumes from the last event id.
+export function subscribeToEvents(handlers: EventHandlers): () => void {
+    const source = new EventSource(`${API_BASE}/events`);
+
+    const listen = <T>(event: string, handler?: (data: T) => void) => {
+        if (!handler) return;
+        source.addEventListener(event, (e) => handler(JSON.parse((e as MessageEvent).data)));
+    };
+
+    source.onopen = () => handlers.onOpen?.();
+    listen('status', handlers.onStatus);
+    listen('scan_started', handlers.onScanStarted);
+    listen('scan_progress', handlers.onScanProgress);
+    listen('changes', handlers.onChanges);
+    listen('scan_completed', handlers.onScanCompleted);
+    listen('resync', handlers.onResync ? () => handlers.onResync?.() : undefined);
+
+    return () => source.close();
+}
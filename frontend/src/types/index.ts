@@ -6,6 +6,8 @@ export interface Announcement {
     content_hash: string;
     first_seen: string;
     last_seen: string;
+    status: 'active' | 'removed';
+    removed_at: string | null;
 }
 
 export interface Change {
@@ -22,12 +24,50 @@ export interface ScanStatus {
     last_scan: string | null;
     is_scanning: boolean;
     announcement_count: number;
+    active_count: number;
+    removed_count: number;
+    changes_today: number;
     error: string | null;
     auto_scan_enabled?: boolean;
     auto_scan_interval?: number;
     next_auto_scan?: string | null;
 }
 
+export interface ScanJob {
+    id: number;
+    state: 'queued' | 'running' | 'succeeded' | 'failed';
+    trigger: 'manual' | 'auto';
+    full: boolean | null;
+    requested_at: string;
+    started_at: string | null;
+    finished_at: string | null;
+    request_count: number;
+    changes_count: number | null;
+    error: string | null;
+    timings: Record<string, unknown>;
+}
+
+export interface ScanStartedEvent {
+    full: boolean;
+}
+
+export interface ScanProgressEvent {
+    page: number;
+    announcements: number;
+    unchanged: boolean;
+}
+
+export interface ChangesEvent {
+    changes: Change[];
+    total: number;
+}
+
+export interface ScanCompletedEvent {
+    full: boolean;
+    changes: number;
+    error: string | null;
+}
+
 export interface Settings {
     refresh_interval: number;
     email_enabled: boolean;
@@ -37,4 +77,7 @@ export interface Settings {
     smtp_port: number;
     smtp_username: string;
     smtp_password: string;
+    digest_window_minutes: number;
+    digest_max_changes: number;
+    recipient_hourly_limit: number;
 }